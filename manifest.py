@@ -0,0 +1,7 @@
+# Freeze growmax into a custom MicroPython firmware, ex. for the Pico W board manifest:
+#   include("$(MPY_DIR)/ports/rp2/boards/RPI_PICO_W/manifest.py")
+#   include("/path/to/growmax/manifest.py")
+# The user's config.py stays on the filesystem so it can still be edited.
+metadata(description="Automated plant watering and monitoring.", version="1.3.0")
+
+package("growmax", base_path="src", opt=2)
@@ -1,33 +1,90 @@
-import machine
 import utime
-from growmax.utils.mcu import i2c_channel_pins
+from micropython import const
 
-import config
+from growmax.utils.configs import settings
+from growmax.utils.i2c_bus import FAST_MODE, get_i2c_bus
 
 
-DEFAULT_ADDRESS = 0x63
+DEFAULT_ADDRESS = const(0x63)
+# EZO pH needs ~900 ms to complete a reading after the R command
+READING_DELAY_MS = const(900)
+# Response codes of the first byte returned by the EZO circuit
+RESPONSE_SUCCESS = const(1)
+RESPONSE_SYNTAX_ERROR = const(2)
+RESPONSE_PENDING = const(254)
+RESPONSE_NO_DATA = const(255)
+PENDING_RETRY_MS = const(50)
+# A reading still pending this long after start_reading is dropped
+READING_TIMEOUT_MS = const(3000)
 
 
 class AtlasPHI2C:
 
     def __init__(self, i2c_channel=0):
-        pin_scl, pin_sda = i2c_channel_pins(i2c_channel)
-        i2c_channel_pins(i2c_channel)
-        self.i2c_bus = machine.I2C(i2c_channel, scl=machine.Pin(pin_scl), sda=machine.Pin(pin_sda), freq=100000)
+        self.i2c_bus = get_i2c_bus(i2c_channel)
 
-        if hasattr(config, "ATLAS_PH_METER_ADDRESS"):
-            self.address = config.ATLAS_PH_METER_ADDRESS or DEFAULT_ADDRESS
-        else:
-            self.address = DEFAULT_ADDRESS
+        self.address = settings.ATLAS_PH_METER_ADDRESS or DEFAULT_ADDRESS
+        self._reading_deadline = None
+        self._reading_started_ms = None
+        self.i2c_bus.register_probe(self.address, self.probe, max_freq=FAST_MODE)
 
-    def obtain_ph_reading(self):
+    def start_reading(self):
+        """Issue the read command and return immediately.
+        The result can be collected with ``collect_reading`` once ``remaining_ms`` reaches 0.
+        """
         self.i2c_bus.writeto(self.address, 'R,\r'.encode())
-        utime.sleep(1.0)
+        self._reading_started_ms = utime.ticks_ms()
+        self._reading_deadline = utime.ticks_add(self._reading_started_ms, READING_DELAY_MS)
+
+    @property
+    def reading_started(self):
+        return self._reading_deadline is not None
+
+    def remaining_ms(self):
+        """Milliseconds until a started reading is expected to be ready."""
+        if self._reading_deadline is None:
+            return 0
+        return max(0, utime.ticks_diff(self._reading_deadline, utime.ticks_ms()))
+
+    def collect_reading(self):
+        """Return the result of ``start_reading``, or None if it is not available (yet).
+        While the device is still processing, ``reading_started`` stays True and the deadline moves out,
+        up to READING_TIMEOUT_MS after ``start_reading``; after that the reading is dropped.
+        """
+        if self._reading_deadline is None or self.remaining_ms():
+            return None
         data = self.i2c_bus.readfrom(self.address, 31)
-        if data[0] == 1:  # Successful reading
+        if data[0] == RESPONSE_PENDING:
+            now = utime.ticks_ms()
+            if utime.ticks_diff(now, self._reading_started_ms) < READING_TIMEOUT_MS:
+                self._reading_deadline = utime.ticks_add(now, PENDING_RETRY_MS)
+                return None
+            self._reading_deadline = None
+            print("Atlas Scientific pH reading timed out")
+            return None
+        self._reading_deadline = None
+        if data[0] == RESPONSE_SUCCESS:  # Successful reading
             reading = data[1:].decode().strip('\x00')
         else:
             reading = None
             print("Unable to get reading--check Atlas Scientific pH device settings")
         return reading
 
+    def probe(self):
+        """Read the status byte, raising if it is not a valid EZO response code.
+        Skipped while a reading is pending so the result is not consumed.
+        """
+        if self.reading_started:
+            return
+        status = self.i2c_bus.readfrom(self.address, 1)[0]
+        if status not in (RESPONSE_SUCCESS, RESPONSE_SYNTAX_ERROR, RESPONSE_PENDING, RESPONSE_NO_DATA):
+            raise RuntimeError("Unexpected EZO status: " + str(status))
+
+    def obtain_ph_reading(self):
+        self.start_reading()
+        while self.reading_started:
+            utime.sleep_ms(self.remaining_ms())
+            reading = self.collect_reading()
+            if not self.reading_started:
+                return reading
+        return None
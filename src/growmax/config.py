@@ -7,17 +7,28 @@ GROWMAX_MCU = "RP2040"
 # Threshold value for moisture sensor (range 0-28)
 # Note: you may set value per plant by assigning an array length 8, Ex: [7, 7, 10, 8, 9, 12, 13, 10]
 SOIL_WET_THRESHOLD = 10
+# Moisture pulses are counted over windows of at least this many ms (250-500 recommended)
+MOISTURE_SAMPLE_WINDOW_MS = 500
+# How moisture pulses are counted: "IRQ" (pin interrupts) or "PIO" (RP2040 state machines, no CPU interrupts)
+MOISTURE_COUNTER_BACKEND = "IRQ"
+# Pump decisions use recent readings filtered with "median", "ema" or "trimmed_mean"
+MOISTURE_FILTER = "median"
+MOISTURE_FILTER_SIZE = 5  # Number of recent readings kept per channel
+MOISTURE_HYSTERESIS = 1  # A dry channel is considered watered once it reads below threshold - hysteresis
 
 # Water Sensor Pins
 # (GP21 and GP22 ports have voltage dividers 4V -> ~3.3V to pair with Optomax Digital Liquid Level Sensors)
 WATER_SENSOR_LOW_ENABLED = True
 WATER_SENSOR_LOW = 22
-WATER_SENSOR_HIGH_ENABLED = False  # Not yet implemented
-WATER_SENSOR_HIGH = 21  # Not yet implemented
+WATER_SENSOR_DEBOUNCE_MS = 1000  # The level must be stable this long before a change is accepted
+WATER_SENSOR_HIGH_ENABLED = False  # When enabled, auto-refill stops as soon as the reservoir reads full
+WATER_SENSOR_HIGH = 21
 
 # Pump settings
 PUMP_WHEN_DRY = False
-PUMP_CYCLE_DURATION = 30  # seconds -- avoid long pump times as it does not check if reservoir is low while pumping!
+PUMP_CYCLE_DURATION = 30  # seconds -- with WATER_SENSOR_LOW_ENABLED pumps stop the moment the reservoir runs low
+PUMP_SUPPLY_BUDGET_MA = 200  # Current available to the pumps; raise when pumps are powered by an external supply
+PUMP_CURRENT_MA = 200  # Current drawn by one pump -- PUMP_SUPPLY_BUDGET_MA // PUMP_CURRENT_MA pumps may run at once
 
 # External Relay board settings
 RELAY_BOARD_ENABLED = False
@@ -26,11 +37,16 @@ RELAY_BOARD_NUM_RELAYS = 4  # 4 or 8
 RELAY_BOARD_I2C_ADDRESS = 0x27  # The address of the relay board
 # Auto-refill reservoir when low (requires water sensor and relay board)
 AUTO_REFILL_RELAY_POSITION = None  # 1-8; None to disable
-AUTO_REFILL_DURATION = 45  # seconds
+AUTO_REFILL_DURATION = 45  # seconds -- maximum refill time, stops earlier when WATER_SENSOR_HIGH reads full
+
+# I2C bus clock
+I2C_FREQ = 100000  # Hz -- clock rate used on both QWIIC channels until they are calibrated
+I2C_AUTO_TUNE = False  # At boot, find the fastest clock rate every device handles reliably and store it in i2c_tuning.json
 
 # Auxiliary Sensors settings
 ADAFRUIT_SCD4X_ENABLED = False
 ADAFRUIT_SCD4X_I2C_CHANNEL = 0  # 0 for QWIIC_I2C0 or 1 for QWIIC_I2C1
+ADAFRUIT_SCD4X_MODE = None  # None picks from SENSOR_POLL_INTERVAL, or set "periodic", "low_power" or "single_shot" (SCD41)
 
 # Atlas Scientific pH sensors
 ATLAS_PH_METER_ENABLED = False
@@ -46,6 +62,18 @@ DISPLAY_SWITCH_CLASS = None  # When set to None, Pin is used directly with inter
 DISPLAY_SWITCH_DURATION_MS = 10000  # When using MotionSensor, this sets how long to turn on display for in ms
 DISPLAY_SWITCH_PULL = None  # When using pin directly: Set to be None, machine.Pin.PULL_UP or machine.Pin.PULL_DOWN
 DISPLAY_SWITCH_TRIGGER = machine.Pin.IRQ_FALLING | machine.Pin.IRQ_RISING
+DISPLAY_SPLASH_DURATION = 5  # Seconds the boot logo is shown (0 skips it); other tasks keep running meanwhile
+DISPLAY_DASHBOARD = False  # Show all channels, reservoir, CO2 and pH on one 128x128 screen, refreshed every DISPLAY_SCREEN_DURATION
+
+# Routine scheduling -- each task runs on its own cadence (seconds) so waits overlap instead of adding up
+MOISTURE_SCAN_INTERVAL = 1  # How often the soil sensors are checked against their thresholds
+WATER_CHECK_INTERVAL = 5  # How often the reservoir level is sampled
+SENSOR_POLL_INTERVAL = 60  # How often the SCD4x and Atlas pH sensors are read
+REPORT_INTERVAL = 60  # How often data is reported and remote commands are retrieved
+WIFI_CHECK_INTERVAL = 30  # How often the Wi-Fi connection is re-checked
+DISPLAY_SCREEN_DURATION = 3  # How long each display screen is shown (dashboard: how often it is refreshed)
+PUMP_SOAK_TIME = 60  # Minimum seconds between doses on the same channel so water can permeate the soil
+PROFILER_ENABLED = False  # Time each routine phase and include min/mean/max/p95 (us) in the reported data
 
 # Wi-Fi SSID and password
 WIFI_ENABLED = False
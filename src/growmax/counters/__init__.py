@@ -0,0 +1,53 @@
+BACKEND_IRQ = "IRQ"
+BACKEND_PIO = "PIO"
+BACKEND_SIMULATED = "SIMULATED"
+
+
+def create_counter(gpio, index=0, backend=BACKEND_IRQ):
+    """Create a rising edge counter for a moisture channel.
+    Backends are imported lazily so unused ones (and their port specific modules) are never loaded.
+    :param gpio: GPIO pin number the sensor is connected to
+    :param index: Channel index (0-7), used to pick the PIO state machine
+    :param backend: One of "IRQ", "PIO" (RP2040 only) or "SIMULATED"
+    """
+    if backend == BACKEND_PIO:
+        try:
+            from growmax.counters.pio import PIOCounter
+            return PIOCounter(gpio, index)
+        except Exception as e:
+            print("PIO counter unavailable for GPIO", gpio, "falling back to IRQ:", e)
+    if backend == BACKEND_SIMULATED:
+        from growmax.counters.simulated import SimulatedCounter
+        return SimulatedCounter(gpio)
+    from growmax.counters.irq import IRQCounter
+    return IRQCounter(gpio)
+
+
+class CounterList:
+    """ Group per-pin counters behind the ``take_into`` interface of ``IRQCounterArray``. """
+
+    def __init__(self, counters):
+        self.counters = counters
+        self.size = len(counters)
+
+    def take_into(self, out):
+        for i in range(self.size):
+            out[i] = self.counters[i].take()
+        return out
+
+    def deinit(self):
+        for counter in self.counters:
+            counter.deinit()
+
+
+def create_counter_array(gpios, backend=BACKEND_IRQ):
+    """Create counters for several moisture channels at once.
+    The IRQ backend shares one handler and count array between all pins.
+    """
+    if backend == BACKEND_IRQ:
+        from growmax.counters.irq import IRQCounterArray
+        return IRQCounterArray(gpios)
+    if backend == BACKEND_SIMULATED:
+        from growmax.counters.simulated import SimulatedCounterArray
+        return SimulatedCounterArray(len(gpios))
+    return CounterList([create_counter(gpio, index, backend) for index, gpio in enumerate(gpios)])
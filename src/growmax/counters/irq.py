@@ -0,0 +1,68 @@
+from array import array
+import machine
+
+
+class IRQCounter:
+    """ Count rising edges on a pin with a pin interrupt.
+    The handler only increments an integer, so it is registered as a hard IRQ where supported.
+    """
+
+    def __init__(self, gpio):
+        self._count = 0
+        self._pin = machine.Pin(gpio, machine.Pin.IN, machine.Pin.PULL_UP)
+        try:
+            self._pin.irq(trigger=machine.Pin.IRQ_RISING, handler=self._event_handler, hard=True)
+        except (TypeError, ValueError):
+            # Port without hard pin interrupts; the handler is safe in either context
+            self._pin.irq(trigger=machine.Pin.IRQ_RISING, handler=self._event_handler)
+
+    def _event_handler(self, pin):
+        self._count += 1
+
+    def take(self):
+        """Return the number of edges counted since the last call and reset the count."""
+        irq_state = machine.disable_irq()
+        count = self._count
+        self._count = 0
+        machine.enable_irq(irq_state)
+        return count
+
+    def deinit(self):
+        self._pin.irq(handler=None)
+
+
+class IRQCounterArray:
+    """ Count rising edges on several pins through one shared handler and a flat count array.
+    The handler only looks up the pin's index and increments its count, so it is hard IRQ safe.
+    """
+
+    def __init__(self, gpios):
+        self.size = len(gpios)
+        self._counts = array("L", [0] * self.size)
+        self._index = {}
+        self._pins = []
+        for index, gpio in enumerate(gpios):
+            pin = machine.Pin(gpio, machine.Pin.IN, machine.Pin.PULL_UP)
+            self._index[pin] = index
+            self._pins.append(pin)
+            try:
+                pin.irq(trigger=machine.Pin.IRQ_RISING, handler=self._event_handler, hard=True)
+            except (TypeError, ValueError):
+                pin.irq(trigger=machine.Pin.IRQ_RISING, handler=self._event_handler)
+
+    def _event_handler(self, pin):
+        self._counts[self._index[pin]] += 1
+
+    def take_into(self, out):
+        """Copy the edges counted on every pin since the last call into out and reset the counts."""
+        counts = self._counts
+        irq_state = machine.disable_irq()
+        for i in range(self.size):
+            out[i] = counts[i]
+            counts[i] = 0
+        machine.enable_irq(irq_state)
+        return out
+
+    def deinit(self):
+        for pin in self._pins:
+            pin.irq(handler=None)
@@ -0,0 +1,47 @@
+from machine import Pin
+import rp2
+
+
+@rp2.asm_pio()
+def _count_rising_edges():
+    # Decrement x on every rising edge; the CPU reads x back on demand
+    wrap_target()
+    wait(0, pin, 0)
+    wait(1, pin, 0)
+    jmp(x_dec, "counted")
+    label("counted")
+    wrap()
+
+
+class PIOCounter:
+    """ Count rising edges in an RP2040 PIO state machine.
+    Counting happens entirely in the PIO block; the CPU only reads the running total
+    when ``take`` is called, so no interrupts are raised per pulse.
+    """
+
+    def __init__(self, gpio, state_machine_id):
+        """Create a counter on a PIO state machine.
+        :param gpio: GPIO pin number to count edges on
+        :param state_machine_id: 0-7; 0-3 are on PIO0 and 4-7 on PIO1 (partly used by Wi-Fi on Pico W)
+        """
+        pin = Pin(gpio, Pin.IN, Pin.PULL_UP)
+        self._sm = rp2.StateMachine(state_machine_id, _count_rising_edges, in_base=pin)
+        self._sm.exec("set(x, 0)")
+        self._sm.active(1)
+        self._last_total = 0
+
+    def _total(self):
+        self._sm.exec("mov(isr, x)")
+        self._sm.exec("push(noblock)")
+        # x counts down from 0, so the edge total is its two's complement
+        return -self._sm.get() & 0xFFFFFFFF
+
+    def take(self):
+        """Return the number of edges counted since the last call."""
+        total = self._total()
+        count = (total - self._last_total) & 0xFFFFFFFF
+        self._last_total = total
+        return count
+
+    def deinit(self):
+        self._sm.active(0)
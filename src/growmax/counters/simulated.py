@@ -0,0 +1,40 @@
+class SimulatedCounter:
+    """ Counter fed from software, for exercising the moisture logic without hardware. """
+
+    def __init__(self, gpio=None):
+        self.gpio = gpio
+        self._count = 0
+
+    def pulse(self, edges=1):
+        """Record edges as if they had been seen on the pin."""
+        self._count += edges
+
+    def take(self):
+        """Return the number of edges recorded since the last call and reset the count."""
+        count = self._count
+        self._count = 0
+        return count
+
+    def deinit(self):
+        pass
+
+
+class SimulatedCounterArray:
+    """ Counters for several channels fed from software, with the ``take_into`` interface of ``IRQCounterArray``. """
+
+    def __init__(self, channels=8):
+        self.size = channels
+        self._counts = [0] * channels
+
+    def pulse(self, position, edges=1):
+        """Record edges on a channel (0 based) as if they had been seen on its pin."""
+        self._counts[position] += edges
+
+    def take_into(self, out):
+        for i in range(self.size):
+            out[i] = self._counts[i]
+            self._counts[i] = 0
+        return out
+
+    def deinit(self):
+        pass
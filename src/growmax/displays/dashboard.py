@@ -0,0 +1,146 @@
+from micropython import const
+
+from growmax.displays.glyphs import GlyphCache
+
+
+# Value fields drawn by the dashboard
+FIELD_WATER = const(0)
+FIELD_CHANNEL = const(1)  # 8 fields, one per moisture channel
+FIELD_CO2 = const(9)
+FIELD_TEMP = const(10)
+FIELD_RH = const(11)
+FIELD_PH = const(12)
+NUM_FIELDS = const(13)
+
+_CHAR = const(8)  # Built-in font is 8x8
+_ROW = const(12)
+_CHANNELS_Y = const(16)
+_SENSORS_Y = const(70)
+# Moisture readings are drawn saturated to 4 characters, so with the dry marker they fit 5
+_MAX_MOISTURE = 99.9
+
+# x, y and width (characters) of each value field on a 128x128 screen
+_FIELDS = (
+    (48, 2, 5),  # water
+    (16, _CHANNELS_Y, 5), (80, _CHANNELS_Y, 5),
+    (16, _CHANNELS_Y + _ROW, 5), (80, _CHANNELS_Y + _ROW, 5),
+    (16, _CHANNELS_Y + 2 * _ROW, 5), (80, _CHANNELS_Y + 2 * _ROW, 5),
+    (16, _CHANNELS_Y + 3 * _ROW, 5), (80, _CHANNELS_Y + 3 * _ROW, 5),
+    (48, _SENSORS_Y, 6),  # CO2
+    (16, _SENSORS_Y + _ROW, 5),  # temperature
+    (88, _SENSORS_Y + _ROW, 5),  # relative humidity
+    (48, _SENSORS_Y + 2 * _ROW, 6),  # pH
+)
+
+# Stored in place of a value that has never been drawn, so the first update always draws
+_UNSET = const(-32768)
+
+
+class Dashboard:
+    """ One 128x128 screen with the reservoir, all 8 moisture channels, the SCD4x and pH.
+    Labels and grid lines are drawn once; each update only clears and redraws the value
+    fields whose value changed, and calls ``show()`` once if anything was drawn, so the
+    display drivers only send the changed areas. Values are drawn from a ``GlyphCache``.
+    """
+
+    def __init__(self, display, color=15):
+        self.display = display
+        self.color = color
+        self.glyphs = GlyphCache(display, color=color)
+        # Last drawn value of each field as a fixed point int, so comparing does not allocate
+        self._drawn = [_UNSET] * NUM_FIELDS
+        self._static_drawn = False
+
+    def invalidate(self):
+        """Redraw the whole dashboard on the next update, ex: after another screen was shown."""
+        self._static_drawn = False
+        for field in range(NUM_FIELDS):
+            self._drawn[field] = _UNSET
+
+    def _draw_static(self):
+        display = self.display
+        color = self.color
+        display.fill(0)
+        display.text("Water", 0, 2, color)
+        display.hline(0, _CHANNELS_Y - 4, 128, color)
+        for position in range(8):
+            x = 0 if position % 2 == 0 else 64
+            display.text(str(position + 1), x, _CHANNELS_Y + (position // 2) * _ROW, color)
+        display.vline(62, _CHANNELS_Y - 4, 4 * _ROW + 2, color)
+        display.hline(0, _SENSORS_Y - 6, 128, color)
+        display.text("CO2", 0, _SENSORS_Y, color)
+        display.text("T", 0, _SENSORS_Y + _ROW, color)
+        display.text("RH", 64, _SENSORS_Y + _ROW, color)
+        display.text("pH", 0, _SENSORS_Y + 2 * _ROW, color)
+        self._static_drawn = True
+
+    @staticmethod
+    def _key(value, scale=10):
+        if value is None:
+            return _UNSET + 1
+        return int(value * scale)
+
+    def _clear(self, field):
+        x, y, width = _FIELDS[field]
+        self.display.fill_rect(x, y, width * _CHAR, _CHAR, 0)
+        return x, y
+
+    def update(self, has_water, soil_moisture, dry=None, ppm_carbon_dioxide=None, temp=None, rh=None,
+               ph_reading=None):
+        """Draw the changed values and show them; returns True if the screen was updated.
+        :param has_water: Reservoir level, or None without a water sensor
+        :param soil_moisture: Readings of the 8 moisture channels
+        :param dry: Channels currently considered dry, marked with ``*``
+        """
+        changed = False
+        if not self._static_drawn:
+            self._draw_static()
+            changed = True
+
+        key = _UNSET + 1 if has_water is None else int(has_water)
+        if self._drawn[FIELD_WATER] != key:
+            x, y = self._clear(FIELD_WATER)
+            self.glyphs.draw_text("--" if has_water is None else ("OK" if has_water else "LOW"), x, y)
+            self._drawn[FIELD_WATER] = key
+            changed = True
+
+        for position in range(8):
+            moisture = min(soil_moisture[position], _MAX_MOISTURE)
+            is_dry = bool(dry and dry[position])
+            key = self._key(moisture) * 2 + is_dry
+            field = FIELD_CHANNEL + position
+            if self._drawn[field] != key:
+                x, y = self._clear(field)
+                x += self.glyphs.draw_number(moisture, x, y, 1)
+                if is_dry:
+                    self.glyphs.draw_glyph("*", x, y)
+                self._drawn[field] = key
+                changed = True
+
+        changed |= self._set_reading(FIELD_CO2, ppm_carbon_dioxide, 0)
+        changed |= self._set_reading(FIELD_TEMP, temp, 1)
+        changed |= self._set_reading(FIELD_RH, rh, 1)
+        changed |= self._set_reading(FIELD_PH, ph_reading, 2)
+
+        if changed:
+            self.display.show()
+        return changed
+
+    def _set_reading(self, field, value, decimals):
+        # Redraw a sensor reading if it changed; returns True if it was drawn
+        if isinstance(value, str):
+            # Atlas pH readings arrive as text
+            try:
+                value = float(value)
+            except ValueError:
+                value = None
+        key = self._key(value, 10 ** decimals)
+        if self._drawn[field] == key:
+            return False
+        x, y = self._clear(field)
+        if value is None:
+            self.glyphs.draw_text("--", x, y)
+        else:
+            self.glyphs.draw_number(value, x, y, decimals)
+        self._drawn[field] = key
+        return True
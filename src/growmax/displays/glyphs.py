@@ -0,0 +1,126 @@
+import framebuf
+import micropython
+from micropython import const
+
+
+# Glyphs pre-rendered by GlyphCache, indexed by their position in this string
+GLYPHS = "0123456789.-* "
+_POINT = const(10)
+_MINUS = const(11)
+_BLANK = const(13)
+_MAX_CELLS = const(12)
+
+_POW10 = (1, 10, 100, 1000)
+
+
+def _buffer_size(fmt, width, height):
+    if fmt == framebuf.GS4_HMSB:
+        return (width * height + 1) // 2
+    if fmt == framebuf.GS8:
+        return width * height
+    if fmt == framebuf.RGB565:
+        return width * height * 2
+    if fmt == framebuf.MONO_VLSB:
+        return width * ((height + 7) // 8)
+    return ((width + 7) // 8) * height
+
+
+class Sprite(framebuf.FrameBuffer):
+    """ A small frame buffer that knows its size, so drivers can track what ``blit`` changed. """
+
+    def __init__(self, width, height, fmt):
+        self.width = width
+        self.height = height
+        self.buffer = bytearray(_buffer_size(fmt, width, height))
+        super().__init__(self.buffer, width, height, fmt)
+
+
+class GlyphCache:
+    """ Digits, the decimal point and short labels rendered once into sprites in the display's
+    own pixel format, optionally scaled up from the built-in 8x8 font.
+    Numbers are drawn by blitting cached glyphs from fixed point digits, so updating a
+    reading allocates no strings and does not rasterize the font again.
+    """
+
+    def __init__(self, display, scale=1, color=15, background=0):
+        self.display = display
+        self.scale = scale
+        self.color = color
+        self.background = background
+        self.format = display.format
+        self.glyph_width = 8 * scale
+        self.glyph_height = 8 * scale
+        # Mono scratch buffer the built-in font is rendered into before scaling
+        self._scratch = framebuf.FrameBuffer(bytearray(8), 8, 8, framebuf.MONO_HLSB)
+        self._glyphs = [self._render(char) for char in GLYPHS]
+        self._labels = {}
+        self._cells = bytearray(_MAX_CELLS)
+
+    def _render(self, text):
+        scale = self.scale
+        sprite = Sprite(8 * scale * len(text), 8 * scale, self.format)
+        sprite.fill(self.background)
+        scratch = self._scratch
+        for i in range(len(text)):
+            scratch.fill(0)
+            scratch.text(text[i], 0, 0, 1)
+            x0 = i * 8 * scale
+            for y in range(8):
+                for x in range(8):
+                    if scratch.pixel(x, y):
+                        sprite.fill_rect(x0 + x * scale, y * scale, scale, scale, self.color)
+        return sprite
+
+    def draw_text(self, text, x, y):
+        """Draw a short fixed label (ex: a unit), rendered on first use and cached after that."""
+        sprite = self._labels.get(text)
+        if sprite is None:
+            sprite = self._render(text)
+            self._labels[text] = sprite
+        self.display.blit(sprite, x, y)
+        return sprite.width
+
+    @micropython.native
+    def draw_number(self, value, x, y, decimals=0, width=0):
+        """Draw value with a fixed number of decimals (0-3), right aligned in width glyphs when given.
+        Returns the width drawn in pixels.
+        """
+        negative = value < 0
+        if negative:
+            value = -value
+        fixed = int(value * _POW10[decimals] + 0.5)
+        # Values that round to zero are drawn without a sign, not as "-0.0"
+        negative = negative and fixed > 0
+        cells = self._cells
+        # Fill the cells from the least significant digit
+        n = 0
+        for _ in range(decimals):
+            cells[n] = fixed % 10
+            fixed //= 10
+            n += 1
+        if decimals:
+            cells[n] = _POINT
+            n += 1
+        while n < _MAX_CELLS - 1:
+            cells[n] = fixed % 10
+            fixed //= 10
+            n += 1
+            if not fixed:
+                break
+        if negative:
+            cells[n] = _MINUS
+            n += 1
+        while n < width and n < _MAX_CELLS:
+            cells[n] = _BLANK
+            n += 1
+
+        glyphs = self._glyphs
+        step = self.glyph_width
+        for i in range(n):
+            self.display.blit(glyphs[cells[n - 1 - i]], x + i * step, y)
+        return n * step
+
+    def draw_glyph(self, char, x, y):
+        """Draw a single character from GLYPHS."""
+        self.display.blit(self._glyphs[GLYPHS.index(char)], x, y)
+        return self.glyph_width
@@ -1,3 +1,4 @@
+import micropython
 from micropython import const
 from framebuf import FrameBuffer, MONO_VLSB, MONO_HMSB
 
@@ -19,7 +20,51 @@ SET_DISP_CLK_DIV = const(0xD5)
 SET_PRECHARGE = const(0xD9)
 SET_VCOM_DESEL = const(0xDB)
 
-TEST_CHUNK = const(8)
+# Changed runs separated by fewer unchanged bytes than this are sent as one write,
+# since each write also costs three addressing commands
+MERGE_GAP = const(8)
+
+
+@micropython.viper
+def _next_modified(curr, prev, start: int, end: int) -> int:
+    # Index of the first byte in start:end that differs from the previous frame, or end
+    c = ptr8(curr)
+    p = ptr8(prev)
+    i = start
+    while i < end:
+        if c[i] != p[i]:
+            return i
+        i += 1
+    return end
+
+
+@micropython.viper
+def _modified_end(curr, prev, start: int, end: int) -> int:
+    # End of the changed run beginning at start, bridging fewer than MERGE_GAP unchanged bytes
+    c = ptr8(curr)
+    p = ptr8(prev)
+    i = start
+    same = 0
+    while i < end:
+        if c[i] == p[i]:
+            same += 1
+            if same >= MERGE_GAP:
+                return i - same + 1
+        else:
+            same = 0
+        i += 1
+    return end - same
+
+
+@micropython.viper
+def _copy(dst, src, start: int, end: int):
+    d = ptr8(dst)
+    s = ptr8(src)
+    i = start
+    while i < end:
+        d[i] = s[i]
+        i += 1
+
 
 class SH1107(FrameBuffer):
     def __init__(self, width, height, external_vcc):
@@ -38,7 +83,9 @@ class SH1107(FrameBuffer):
         self.curr_buffer = bytearray(b'\x00' * size) # self.fill(0)
         self.framebuf = self
         self.prev_buffer = bytearray(b'\xff' * size) # force full refresh
-        super().__init__(self.curr_buffer, self.width, self.height, MONO_VLSB if self.page_mode else MONO_HMSB)
+        self._curr_mv = memoryview(self.curr_buffer)
+        self.format = MONO_VLSB if self.page_mode else MONO_HMSB
+        super().__init__(self.curr_buffer, self.width, self.height, self.format)
         self.init_display()
 
     def init_display(self):
@@ -80,51 +127,47 @@ class SH1107(FrameBuffer):
     def invert(self, invert):
         self.write_cmd(SET_NORM_INV | (invert & 1))
 
+    def probe(self):
+        # Harmless command (output follows RAM), used to check the display still ACKs at the current I2C clock rate
+        self.write_cmd(SET_ENTIRE_ON | 0x00)
+
     def show(self):
         if self.page_mode:
             self.show_page_mode()
         else:
             self.show_vert_mode()
-        self.prev_buffer[:] = self.curr_buffer
 
     def show_page_mode(self):
+        curr, prev = self.curr_buffer, self.prev_buffer
         for page in range(self.pages):
             noffs = page * self.width
-            for col1, col2 in self.test_modified(noffs, self.width):
+            end = noffs + self.width
+            col1 = _next_modified(curr, prev, noffs, end)
+            while col1 < end:
+                col2 = _modified_end(curr, prev, col1, end)
                 c = col1 - noffs
                 self.write_cmd(SET_PAGE_ADDR | page)
                 self.write_cmd(SET_COL_LO_ADDR | (c & 0x0f))
                 self.write_cmd(SET_COL_HI_ADDR | ((c & 0x70) >> 4))
-                self.write_data(self.curr_buffer[col1 : col2])
-                # print('Write offsets {} : {}, col: {}'.format(col1, col2, c))
+                self.write_data(self._curr_mv[col1 : col2])
+                # Only what was sent becomes the previous frame
+                _copy(prev, curr, col1, col2)
+                col1 = _next_modified(curr, prev, col2, end)
 
     def show_vert_mode(self):
+        curr, prev = self.curr_buffer, self.prev_buffer
         for col in range(self.height):
             noffs = col * self.line_bytes
-            for page1, page2 in self.test_modified(noffs, self.line_bytes):
+            end = noffs + self.line_bytes
+            page1 = _next_modified(curr, prev, noffs, end)
+            while page1 < end:
+                page2 = _modified_end(curr, prev, page1, end)
                 self.write_cmd(SET_PAGE_ADDR | (page1 - noffs))
                 self.write_cmd(SET_COL_LO_ADDR | (col & 0x0f))
                 self.write_cmd(SET_COL_HI_ADDR | ((col & 0x70) >> 4))
-                self.write_data(self.curr_buffer[page1 : page2])
-                # print('Write offsets {} : {}, page: {}'.format(page1, page2, page1 - noffs))
-
-    def test_modified(self, offs, width):
-        ptr = offs
-        width += offs
-        while ptr < width:
-            # skip unmodified chunks
-            while ptr < width and self.curr_buffer[ptr : ptr + TEST_CHUNK] == self.prev_buffer[ptr : ptr + TEST_CHUNK]:
-                ptr += TEST_CHUNK
-
-            if ptr < width:
-                first = ptr
-                ptr += TEST_CHUNK
-                # find modified chunks
-                while ptr < width and self.curr_buffer[ptr : ptr + TEST_CHUNK] != self.prev_buffer[ptr : ptr + TEST_CHUNK]:
-                    ptr += TEST_CHUNK
-
-                yield first, ptr
-                ptr += TEST_CHUNK
+                self.write_data(self._curr_mv[page1 : page2])
+                _copy(prev, curr, page1, page2)
+                page1 = _next_modified(curr, prev, page2, end)
 
 
 class SH1107_I2C(SH1107):
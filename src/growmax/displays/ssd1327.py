@@ -55,8 +55,17 @@ class SSD1327:
     def __init__(self, width=128, height=128):
         self.width = width
         self.height = height
+        self.format = framebuf.GS4_HMSB
         self.buffer = bytearray(self.width * self.height // 2)
-        self.framebuf = framebuf.FrameBuffer(self.buffer, self.width, self.height, framebuf.GS4_HMSB)
+        self.framebuf = framebuf.FrameBuffer(self.buffer, self.width, self.height, self.format)
+        self.stride = self.width // 2
+        self._buffer_mv = memoryview(self.buffer)
+
+        # Dirty region not yet sent to the display, and the region drawn since the last fill.
+        # Both are (x0, y0, x1, y1) with exclusive x1/y1; x0 >= x1 means empty.
+        self._dirty = [0, 0, 0, 0]
+        self._content = [0, 0, 0, 0]
+        self._fill_col = 0
 
         self.col_addr = ((128 - self.width) // 4, 63 - ((128 - self.width) // 4))
         # 96x96     (8, 55)
@@ -105,8 +114,11 @@ class SSD1327:
             SET_SCROLL_DEACTIVATE,
             SET_DISP | 0x01): # Display on
             self.write_cmd(cmd)
-        self.fill(0)
+        self.framebuf.fill(0)
+        self._fill_col = 0
+        self._content[0] = self._content[2] = 0
         self.write_data(self.buffer)
+        self._dirty[0] = self._dirty[2] = 0
 
     def poweroff(self):
         self.write_cmd(SET_FN_SELECT_A)
@@ -133,30 +145,101 @@ class SSD1327:
     def invert(self, invert):
         self.write_cmd(SET_DISP_MODE | (invert & 1) << 1 | (invert & 1)) # 0xA4=Normal, 0xA7=Inverted
 
+    def probe(self):
+        # Harmless command, used to check the display still ACKs at the current I2C clock rate
+        self.write_cmd(SET_SCROLL_DEACTIVATE)
+
+    @staticmethod
+    def _union(region, x0, y0, x1, y1):
+        if region[0] >= region[2]:
+            region[0], region[1], region[2], region[3] = x0, y0, x1, y1
+        else:
+            region[0] = min(region[0], x0)
+            region[1] = min(region[1], y0)
+            region[2] = max(region[2], x1)
+            region[3] = max(region[3], y1)
+
+    def mark_dirty(self, x, y, w, h):
+        """Record that the area was drawn, ex: after drawing on ``framebuf`` directly."""
+        x0 = max(0, x)
+        y0 = max(0, y)
+        x1 = min(self.width, x + w)
+        y1 = min(self.height, y + h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        self._union(self._dirty, x0, y0, x1, y1)
+        self._union(self._content, x0, y0, x1, y1)
+
     def show(self):
+        """Send the rows and columns changed since the last ``show`` to the display."""
+        x0, y0, x1, y1 = self._dirty
+        if x0 >= x1:
+            return
+        # Two GS4 pixels per byte, so the column window is in units of 2 pixels
+        col0 = x0 // 2
+        col1 = (x1 + 1) // 2
         self.write_cmd(SET_COL_ADDR)
-        self.write_cmd(self.col_addr[0])
-        self.write_cmd(self.col_addr[1])
+        self.write_cmd(self.col_addr[0] + col0)
+        self.write_cmd(self.col_addr[0] + col1 - 1)
         self.write_cmd(SET_ROW_ADDR)
-        self.write_cmd(self.row_addr[0])
-        self.write_cmd(self.row_addr[1])
-        self.write_data(self.buffer)
+        self.write_cmd(self.row_addr[0] + y0)
+        self.write_cmd(self.row_addr[0] + y1 - 1)
+        if col0 == 0 and col1 == self.stride:
+            self.write_data(self._buffer_mv[y0 * self.stride:y1 * self.stride])
+        else:
+            # The RAM pointer wraps inside the window, so rows can be sent one after the other
+            for y in range(y0, y1):
+                offset = y * self.stride
+                self.write_data(self._buffer_mv[offset + col0:offset + col1])
+        self._dirty[0] = self._dirty[2] = 0
 
     def fill(self, col):
         self.framebuf.fill(col)
+        if col == self._fill_col and self._content[0] < self._content[2]:
+            # Only what was drawn since the last fill has to be cleared on the display
+            self._union(self._dirty, *self._content)
+        elif col != self._fill_col:
+            self._union(self._dirty, 0, 0, self.width, self.height)
+        self._fill_col = col
+        self._content[0] = self._content[2] = 0
 
     def pixel(self, x, y, col):
         self.framebuf.pixel(x, y, col)
+        self.mark_dirty(x, y, 1, 1)
 
     def line(self, x1, y1, x2, y2, col):
         self.framebuf.line(x1, y1, x2, y2, col)
+        self.mark_dirty(min(x1, x2), min(y1, y2), abs(x2 - x1) + 1, abs(y2 - y1) + 1)
+
+    def hline(self, x, y, w, col):
+        self.framebuf.hline(x, y, w, col)
+        self.mark_dirty(x, y, w, 1)
+
+    def vline(self, x, y, h, col):
+        self.framebuf.vline(x, y, h, col)
+        self.mark_dirty(x, y, 1, h)
+
+    def rect(self, x, y, w, h, col):
+        self.framebuf.rect(x, y, w, h, col)
+        self.mark_dirty(x, y, w, h)
+
+    def fill_rect(self, x, y, w, h, col):
+        self.framebuf.fill_rect(x, y, w, h, col)
+        self.mark_dirty(x, y, w, h)
 
     def scroll(self, dx, dy):
         self.framebuf.scroll(dx, dy)
         # software scroll
+        self.mark_dirty(0, 0, self.width, self.height)
 
     def text(self, string, x, y, col=15):
         self.framebuf.text(string, x, y, col)
+        self.mark_dirty(x, y, 8 * len(string), 8)
+
+    def blit(self, fbuf, x, y, key=-1):
+        self.framebuf.blit(fbuf, x, y, key)
+        # Sprites (see growmax.displays.glyphs) know their size, anything else may cover the rest of the screen
+        self.mark_dirty(x, y, getattr(fbuf, "width", self.width), getattr(fbuf, "height", self.height))
 
     def write_cmd(self):
         raise NotImplementedError
@@ -2,55 +2,65 @@
 # Modified by opensensor.io to work with Pico Grow Max boards and intended for use with pimoroni moisture sensors.
 # The original class was written to require Raspberry Pi OS and is available
 # here:  https://github.com/pimoroni/grow-python/blob/master/library/grow/moisture.py
+from array import array
 import utime
-import machine
 
 from growmax import constants
+from growmax.counters import create_counter, create_counter_array, BACKEND_IRQ
+from growmax.utils.filters import SampleFilter, FILTER_MEDIAN
 from growmax.utils.mcu import get_gpio_for_mcu
 
 
+# Default length of the counting window, readings are computed from the pulses counted over at least this long
+DEFAULT_WINDOW_MS = 500
+
+
 class Moisture(object):
     """Grow moisture sensor driver."""
 
-    def __init__(self, channel=1, wet_point=None, dry_point=None):
+    def __init__(self, channel=1, wet_point=None, dry_point=None, window_ms=DEFAULT_WINDOW_MS,
+                 backend=BACKEND_IRQ, counter=None, filter_mode=FILTER_MEDIAN, filter_size=5):
         """Create a new moisture sensor.
-        Uses an interrupt to count pulses on the GPIO pin corresponding to the selected channel.
+        Counts pulses on the GPIO pin corresponding to the selected channel.
         The moisture reading is given as pulses per second.
-        :param channel: One of 1, 2 or 3. 4 can optionally be used to set up a sensor on the Int pin (BCM4)
+        :param channel: One of 1 to 8
         :param wet_point: Wet point in pulses/sec
         :param dry_point: Dry point in pulses/sec
+        :param window_ms: Minimum counting window in ms; a new reading is computed once it has elapsed
+        :param backend: Pulse counter backend, "IRQ" (default) or "PIO" (RP2040 only)
+        :param counter: Use this counter instead of creating one for the backend (ex: a SimulatedCounter)
+        :param filter_mode: Filter applied to recent readings, "median", "ema" or "trimmed_mean"
+        :param filter_size: Number of recent readings kept for filtering
         """
         rp2040_pin = constants.MOISTURE_GPIOS[channel - 1]
         self._gpio_pin = get_gpio_for_mcu(rp2040_pin)
-        pin = machine.Pin(self._gpio_pin, machine.Pin.IN, machine.Pin.PULL_UP)
+        self._counter = counter if counter is not None else create_counter(self._gpio_pin, channel - 1, backend)
 
-        self._count = 0
         self._reading = 0
-        self._last_pulse = utime.time()
         self._new_data = False
         self._wet_point = wet_point if wet_point is not None else 0.7
         self._dry_point = dry_point if dry_point is not None else 27.6
-        self._time_last_reading = utime.time()
-        try:
-            pin.irq(trigger=machine.Pin.IRQ_RISING, handler=self._event_handler)
-            # GPIO.add_event_detect(self._gpio_pin, GPIO.RISING, callback=self._event_handler, bouncetime=1)
-        except RuntimeError as e:
-            raise e
-
-        self._time_start = utime.time()
-
-    def _event_handler(self, pin):
-        self._count += 1
-        self._last_pulse = utime.time()
-        if self._time_elapsed >= 3.0:
-            self._reading = self._count / self._time_elapsed
-            self._count = 0
-            self._time_last_reading = utime.time()
-            self._new_data = True
+        self._window_us = window_ms * 1000
+        self._window_start = utime.ticks_us()
+        self._last_pulse = self._window_start
+        self._filter = SampleFilter(1, filter_size, filter_mode)
 
-    @property
-    def _time_elapsed(self):
-        return utime.time() - self._time_last_reading
+    def _update(self):
+        """Compute a new reading from the pulses counted since the window started, once it has elapsed."""
+        now = utime.ticks_us()
+        elapsed = utime.ticks_diff(now, self._window_start)
+        if 0 <= elapsed < self._window_us:
+            return
+        count = self._counter.take()
+        self._window_start = now
+        if elapsed <= 0:
+            # The tick counter wrapped while the sensor was not being read; start a fresh window
+            return
+        self._reading = count * 1000000 / elapsed
+        self._filter.push(0, self._reading)
+        if count:
+            self._last_pulse = now
+        self._new_data = True
 
     def set_wet_point(self, value=None):
         """Set the sensor wet point.
@@ -76,19 +86,32 @@ class Moisture(object):
         Full immersion in water is approximately 50 pulses/sec.
         Fully dry (in air) is approximately 900 pulses/sec.
         """
+        self._update()
         self._new_data = False
         return self._reading
 
+    @property
+    def filtered(self):
+        """Return the moisture level filtered over the recent readings.
+        Less sensitive to single spiky readings than ``moisture``; same units.
+        """
+        self._update()
+        return self._filter.value(0)
+
     @property
     def active(self):
         """Check if the moisture sensor is producing a valid reading."""
-        return (utime.time() - self._last_pulse) < 1.0 and self._reading >= 0 and self._reading <= 28
+        self._update()
+        timeout_us = max(1000000, 2 * self._window_us)
+        return (utime.ticks_diff(utime.ticks_us(), self._last_pulse) < timeout_us
+                and self._reading >= 0 and self._reading <= 28)
 
     @property
     def new_data(self):
         """Check for new reading.
         Returns True if moisture value has been updated since last reading moisture or saturation.
         """
+        self._update()
         return self._new_data
 
     @property
@@ -103,4 +126,109 @@ class Moisture(object):
         """
         saturation = float(self.moisture - self._dry_point) / self.range
         saturation = round(saturation, 3)
-        return max(0.0, min(1.0, saturation))
\ No newline at end of file
+        return max(0.0, min(1.0, saturation))
+
+
+class MoistureArray(object):
+    """All Grow moisture channels sampled together.
+    Counts, timestamps and readings for every channel live in shared flat arrays and are
+    updated in one pass, so a full scan takes milliseconds and costs no per-channel objects.
+    Channels are addressed by position, 0 based.
+    """
+
+    def __init__(self, channels=8, wet_point=None, dry_point=None, window_ms=DEFAULT_WINDOW_MS,
+                 backend=BACKEND_IRQ, counters=None, filter_mode=FILTER_MEDIAN, filter_size=5):
+        """Create the moisture channels.
+        :param channels: Number of channels, starting at channel 1
+        :param wet_point: Wet point in pulses/sec applied to every channel
+        :param dry_point: Dry point in pulses/sec applied to every channel
+        :param window_ms: Minimum counting window in ms; new readings are computed once it has elapsed
+        :param backend: Pulse counter backend, "IRQ" (default) or "PIO" (RP2040 only)
+        :param counters: Use these counters instead of creating them for the backend, must provide take_into
+        :param filter_mode: Filter applied to recent readings, "median", "ema" or "trimmed_mean"
+        :param filter_size: Number of recent readings kept for filtering
+        """
+        self.channels = channels
+        if counters is None:
+            gpios = [get_gpio_for_mcu(constants.MOISTURE_GPIOS[position]) for position in range(channels)]
+            counters = create_counter_array(gpios, backend)
+        self._counters = counters
+        self._counts = array("L", [0] * channels)
+        self._readings = array("f", [0.0] * channels)
+        self._wet_points = array("f", [wet_point if wet_point is not None else 0.7] * channels)
+        self._dry_points = array("f", [dry_point if dry_point is not None else 27.6] * channels)
+        self._window_us = window_ms * 1000
+        self._window_start = utime.ticks_us()
+        self._last_pulse = array("L", [self._window_start] * channels)
+        self._filter = SampleFilter(channels, filter_size, filter_mode)
+
+    def update(self):
+        """Compute new readings for every channel once the counting window has elapsed.
+        Returns True if new readings were computed.
+        """
+        now = utime.ticks_us()
+        elapsed = utime.ticks_diff(now, self._window_start)
+        if 0 <= elapsed < self._window_us:
+            return False
+        self._counters.take_into(self._counts)
+        self._window_start = now
+        if elapsed <= 0:
+            # The tick counter wrapped while the sensors were not being read; start a fresh window
+            return False
+        for position in range(self.channels):
+            count = self._counts[position]
+            reading = count * 1000000 / elapsed
+            self._readings[position] = reading
+            self._filter.push(position, reading)
+            if count:
+                self._last_pulse[position] = now
+        return True
+
+    def read_into(self, out):
+        """Copy the latest raw reading (pulses/sec) of every channel into out."""
+        self.update()
+        for position in range(self.channels):
+            out[position] = self._readings[position]
+        return out
+
+    def filtered_into(self, out):
+        """Copy the filtered reading of every channel into out."""
+        self.update()
+        for position in range(self.channels):
+            out[position] = self._filter.value(position)
+        return out
+
+    def saturation_into(self, out):
+        """Copy the saturation (0.0 to 1.0, from the wet and dry points) of every channel into out."""
+        self.update()
+        for position in range(self.channels):
+            dry_point = self._dry_points[position]
+            saturation = (self._readings[position] - dry_point) / (self._wet_points[position] - dry_point)
+            out[position] = max(0.0, min(1.0, saturation))
+        return out
+
+    def moisture(self, position):
+        """Return the raw moisture level (pulses/sec) of a channel."""
+        self.update()
+        return self._readings[position]
+
+    def filtered(self, position):
+        """Return the filtered moisture level of a channel."""
+        self.update()
+        return self._filter.value(position)
+
+    def active(self, position):
+        """Check if a channel is producing a valid reading."""
+        self.update()
+        timeout_us = max(1000000, 2 * self._window_us)
+        reading = self._readings[position]
+        return (utime.ticks_diff(utime.ticks_us(), self._last_pulse[position]) < timeout_us
+                and reading >= 0 and reading <= 28)
+
+    def set_wet_point(self, position, value=None):
+        """Set a channel's wet point, leave value as None to use its last reading."""
+        self._wet_points[position] = value if value is not None else self._readings[position]
+
+    def set_dry_point(self, position, value=None):
+        """Set a channel's dry point, leave value as None to use its last reading."""
+        self._dry_points[position] = value if value is not None else self._readings[position]
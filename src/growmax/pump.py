@@ -4,6 +4,7 @@
 # here:  https://github.com/pimoroni/grow-python/blob/master/library/grow/pump.py
 import machine
 import time
+import utime
 
 from growmax import constants
 from growmax.utils.mcu import get_gpio_for_mcu
@@ -11,6 +12,8 @@ from growmax.utils.mcu import get_gpio_for_mcu
 
 PUMP_PWM_FREQ = 10000
 PUMP_MAX_DUTY = 65535
+# Queue priority used for doses that were explicitly requested (ex: remote commands)
+PRIORITY_MANUAL = 100
 
 
 class Pump(object):
@@ -31,6 +34,7 @@ class Pump(object):
         self._pwm.duty_u16(0)
 
         self._timeout = None
+        self._deadline = None
 
     def _stop(self):
         self._pwm.duty_u16(0)
@@ -48,23 +52,148 @@ class Pump(object):
         """Return Pump speed (PWM duty cycle)."""
         return self._speed
 
-    def stop(self):
-        """Stop the pump."""
+    def _cancel_timeout(self):
         if self._timeout is not None:
-            self._timeout.cancel()
+            self._timeout.deinit()
             self._timeout = None
+
+    def stop(self):
+        """Stop the pump."""
+        self._cancel_timeout()
+        self._deadline = None
         self.set_speed(0)
 
-    def dose(self, speed, timeout=0.1):
+    def halt(self):
+        """Stop the pump immediately.
+        Safe to call from a hard interrupt handler; a pending dose timer just finds the pump stopped.
+        """
+        self._stop()
+        self._speed = 0
+        self._deadline = None
+
+    @property
+    def dosing(self):
+        """Return True while a non-blocking dose is running."""
+        return self._deadline is not None
+
+    def service(self):
+        """Stop a non-blocking dose once its deadline has passed.
+        Only needed where virtual timers are unavailable, but always safe to call.
+        Returns True while the pump is still dosing.
+        """
+        if self._deadline is not None and utime.ticks_diff(self._deadline, utime.ticks_ms()) <= 0:
+            self.stop()
+        return self._deadline is not None
+
+    def _timeout_expired(self, _):
+        self.stop()
+
+    def dose(self, speed, timeout=0.1, blocking=True, force=False):
         """Pulse the pump for timeout seconds.
         :param timeout: Timeout, in seconds, of the pump pulse
         :param blocking: If true, function will block until pump has stopped
         :param force: Applies only to non-blocking. If true, any previous dose will be replaced
         """
         print(f"Dose pump on GPIO pin {self._pin} at speed {speed} for {timeout} seconds.")
-        if self.set_speed(speed):
-            time.sleep(timeout)
+        if blocking:
+            if self.set_speed(speed):
+                time.sleep(timeout)
+                self.stop()
+                return True
+            return False
+
+        if self.dosing:
+            if not force:
+                return False
             self.stop()
-            return True
+        self._cancel_timeout()
+        if not self.set_speed(speed):
+            return False
+        timeout_ms = int(timeout * 1000)
+        self._deadline = utime.ticks_add(utime.ticks_ms(), timeout_ms)
+        try:
+            self._timeout = machine.Timer(-1)
+            self._timeout.init(mode=machine.Timer.ONE_SHOT, period=timeout_ms, callback=self._timeout_expired)
+        except (ValueError, TypeError):
+            # No virtual timers on this port; PumpScheduler.service stops the pump at the deadline
+            self._timeout = None
+        return True
+
+
+class PumpScheduler(object):
+    """Run queued pump doses concurrently within a supply current budget."""
+
+    def __init__(self, pumps, budget_ma=200, pump_ma=200):
+        """Create a new scheduler for the given pumps.
+        :param pumps: List of Pump instances indexed by position - 1
+        :param budget_ma: Current the pump supply can deliver, in mA
+        :param pump_ma: Current drawn by a single running pump, in mA
+        """
+        self.pumps = pumps
+        self.max_active = max(1, budget_ma // pump_ma)
+        self.last_dose_ms = [None] * len(pumps)
+        self._queue = []
+        self._active = [False] * len(pumps)
 
+    def busy(self, position):
+        """Return True if position (0 based) has a dose queued or running."""
+        if self._active[position]:
+            return True
+        for entry in self._queue:
+            if entry[1] == position:
+                return True
         return False
+
+    @property
+    def active_count(self):
+        return sum(self._active)
+
+    def request(self, position, duration, priority=0, speed=1):
+        """Queue a dose for position (0 based).
+        Doses with the highest priority (how far the channel is past its threshold) start first.
+        Returns False if the position already has a dose running.
+        """
+        if self._active[position]:
+            return False
+        for entry in self._queue:
+            if entry[1] == position:
+                entry[0] = max(entry[0], priority)
+                entry[2] = speed
+                entry[3] = duration
+                return True
+        self._queue.append([priority, position, speed, duration])
+        return True
+
+    def clear_queue(self):
+        """Drop all doses that have not started yet."""
+        self._queue.clear()
+
+    def halt_all(self):
+        """Stop every running pump immediately.
+        Safe to call from a hard interrupt handler; the next ``service`` call reaps the stopped doses.
+        """
+        for position in range(len(self.pumps)):
+            self.pumps[position].halt()
+
+    def stop_all(self):
+        """Stop every running pump and drop all queued doses."""
+        self.clear_queue()
+        for pump in self.pumps:
+            pump.stop()
+        self.service()
+
+    def service(self):
+        """Reap finished doses and start queued ones while the current budget allows."""
+        now = utime.ticks_ms()
+        for position, pump in enumerate(self.pumps):
+            if self._active[position] and not pump.service():
+                self._active[position] = False
+                self.last_dose_ms[position] = now
+
+        if not self._queue:
+            return
+        self._queue.sort(key=lambda entry: entry[0], reverse=True)
+        while self._queue and self.active_count < self.max_active:
+            priority, position, speed, duration = self._queue.pop(0)
+            if self.pumps[position].dose(speed, duration, blocking=False):
+                self._active[position] = True
@@ -1,28 +1,180 @@
+import utime
+
+# Immediate attempts per write; after that the write is retried by later calls (ex: service)
+WRITE_ATTEMPTS = 2
+# Delay before retrying a failed write that only switches relays on; switching off is retried at once
+RETRY_BACKOFF_MS = 1000
 
 class RelayBoard:
     def __init__(self, i2c, addr=0x27, num_relays=8):
         self.i2c = i2c
         self.addr = addr
         self.num_relays = num_relays
-        # Initialize all relays to off (0)
-        self.state = [0]*8
+        # Initialize all relays to off; relay 1 is the most significant bit of the port
+        self._mask = 0
+        # Bitmask last written to (and confirmed by) the board, None until the next write is confirmed
+        self._written = None
+        # Relays that may be on: the confirmed state plus anything a failed write may have switched on
+        self._maybe_on = 0
+        # Bitmask of the last failed write (logged once) and when it may be retried
+        self._failed = None
+        self._retry_at = None
+        self._transaction_depth = 0
+        self._buf = bytearray(1)
+        # Timed operations per position: ticks_ms to switch on (None once on) and to switch off
+        self._on_at = [None] * 8
+        self._off_at = [None] * 8
+
+    @staticmethod
+    def _bit(position):
+        return 1 << (8 - position)
+
+    @property
+    def state(self):
+        """Return the relay states as a list of 0/1 for positions 1-8."""
+        return [1 if self._mask & self._bit(position) else 0 for position in range(1, 9)]
+
+    def is_on(self, position):
+        return bool(self._mask & self._bit(position))
+
+    @property
+    def confirmed(self):
+        """True once the board has confirmed the current relay states by readback."""
+        return self._mask == self._written
+
+    def is_confirmed_off(self, position):
+        """True if the last confirmed write left position off."""
+        return self._written is not None and not self._written & self._bit(position)
 
     def turn_on(self, position):
         # Turn on relay at the specified position
-        position -= 1
-        self.state[position] = 1
+        self._mask |= self._bit(position)
         self._write_state()
 
     def turn_off(self, position):
-        # Turn off relay at the specified position
-        position -= 1
-        self.state[position] = 0
+        # Turn off relay at the specified position, cancelling any timed operation
+        self._clear_schedule(position)
+        self._mask &= ~self._bit(position)
+        self._write_state()
+
+    def set_many(self, on=(), off=()):
+        """Turn several relays on and off with a single I2C write."""
+        for position in on:
+            self._mask |= self._bit(position)
+        for position in off:
+            self._clear_schedule(position)
+            self._mask &= ~self._bit(position)
+        self._write_state()
+
+    def all_off(self, keep=()):
+        """Turn off every relay except the positions in keep, with a single I2C write."""
+        keep_mask = 0
+        for position in keep:
+            if position:
+                keep_mask |= self._bit(position)
+        for position in range(1, 9):
+            if not keep_mask & self._bit(position):
+                self._clear_schedule(position)
+        self._mask &= keep_mask
+        self._write_state()
+
+    def pulse(self, position, seconds):
+        """Turn a relay on now and off after seconds, without blocking.
+        Requires ``service`` to be called regularly; ``cancel`` stops it early.
+        """
+        self.schedule(position, seconds)
+
+    def schedule(self, position, seconds, delay=0):
+        """Turn a relay on after delay seconds and off again seconds later, without blocking."""
+        now = utime.ticks_ms()
+        index = position - 1
+        self._off_at[index] = utime.ticks_add(now, int((delay + seconds) * 1000))
+        if delay > 0:
+            self._on_at[index] = utime.ticks_add(now, int(delay * 1000))
+        else:
+            self._on_at[index] = None
+            self.turn_on(position)
+
+    def cancel(self, position):
+        """Cancel a timed operation and turn the relay off."""
+        self.turn_off(position)
+
+    def scheduled(self, position):
+        """Return True while a timed operation on position is pending or running."""
+        return self._off_at[position - 1] is not None
+
+    def remaining_ms(self, position):
+        """Milliseconds until a timed operation switches position off."""
+        off_at = self._off_at[position - 1]
+        if off_at is None:
+            return 0
+        return max(0, utime.ticks_diff(off_at, utime.ticks_ms()))
+
+    def _clear_schedule(self, position):
+        self._on_at[position - 1] = None
+        self._off_at[position - 1] = None
+
+    def service(self):
+        """Apply timed operations that are due, with a single I2C write."""
+        now = utime.ticks_ms()
+        with self.transaction():
+            for index in range(8):
+                on_at = self._on_at[index]
+                if on_at is not None and utime.ticks_diff(now, on_at) >= 0:
+                    self._on_at[index] = None
+                    self._mask |= self._bit(index + 1)
+                off_at = self._off_at[index]
+                if off_at is not None and utime.ticks_diff(now, off_at) >= 0:
+                    self._clear_schedule(index + 1)
+                    self._mask &= ~self._bit(index + 1)
+
+    def transaction(self):
+        """Batch changes: ``with board.transaction(): ...`` writes the board once on exit."""
+        return self
+
+    def __enter__(self):
+        self._transaction_depth += 1
+        return self
+
+    def __exit__(self, *args):
+        self._transaction_depth -= 1
         self._write_state()
+        return False
+
+    def probe(self):
+        """Read the port back, raising if it does not match the last confirmed write."""
+        port = self.i2c.readfrom(self.addr, 1)[0]
+        if self._written is not None and port != ~self._written & 0xFF:
+            raise RuntimeError("Relay board readback mismatch")
 
     def _write_state(self):
-        # Convert state list to integer
-        state_as_int = int(''.join(map(str, self.state)), 2)
+        if self._transaction_depth or self._mask == self._written:
+            return
+        # Retries that would switch a relay off are never delayed, only those that switch relays on
+        if (self._retry_at is not None and not self._maybe_on & ~self._mask
+                and utime.ticks_diff(self._retry_at, utime.ticks_ms()) > 0):
+            return
         # If relay board uses active low, invert the bits before sending
-        inverted_state = ~state_as_int & 0xFF
-        print(f"Writing state to relay board: {bin(inverted_state)}")
-        self.i2c.writeto(self.addr, inverted_state.to_bytes(1, "big"))
+        inverted_state = ~self._mask & 0xFF
+        self._buf[0] = inverted_state
+        error = "readback mismatch"
+        for _ in range(WRITE_ATTEMPTS):
+            try:
+                self.i2c.writeto(self.addr, self._buf)
+                # Read the PCF8574 port back to confirm the relays switched
+                if self.i2c.readfrom(self.addr, 1)[0] == inverted_state:
+                    self._written = self._mask
+                    self._maybe_on = self._mask
+                    self._failed = None
+                    self._retry_at = None
+                    return
+                error = "readback mismatch"
+            except OSError as e:
+                error = e
+        # The board state is unknown until a write is confirmed, so the next call writes again
+        self._written = None
+        self._maybe_on |= self._mask
+        self._retry_at = utime.ticks_add(utime.ticks_ms(), RETRY_BACKOFF_MS)
+        if self._failed != self._mask:
+            self._failed = self._mask
+            print("Relay board write failed, retrying:", error)
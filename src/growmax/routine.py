@@ -3,136 +3,440 @@ import random
 import utime
 from machine import Pin
 
-from growmax.atlas_ph.i2c import AtlasPHI2C
-from growmax.moisture import Moisture
-from growmax.pump import Pump
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from growmax.moisture import MoistureArray
+from growmax.sensors.water_level import WaterLevelSensor
+from growmax.pump import Pump, PumpScheduler, PRIORITY_MANUAL
 from growmax.utils import api
-from growmax.utils.configs import get_config_value, get_moisture_threshold_for_position
-from growmax.utils.displays import boot_sequence, display_basic_stats, display_ph_reading, display_scd4x_reading
+from growmax.utils.configs import apply_config_command, reload_if_changed, settings
+from growmax.utils.i2c_bus import calibrate_all, wait_ready
+from growmax.utils.displays import (display_basic_stats, display_dashboard, display_ph_reading, display_scd4x_reading,
+                                   init_display, show_splash, sync_display_power, wait_display_change)
 from growmax.utils.mcu import get_gpio_for_mcu
+from growmax.utils.profiler import (PhaseProfiler, PHASE_WIFI, PHASE_MOISTURE, PHASE_WATER, PHASE_DOSING,
+                                    PHASE_REFILL, PHASE_PH, PHASE_SCD4X, PHASE_REPORT, PHASE_DISPLAY)
 from growmax.utils.relays import initialize_relay_board
-from growmax.utils.sensors import init_adafruit_scd4x, read_adafruit_scd4x
-from growmax.utils.water import statistically_has_water
+from growmax.utils.sensors import init_adafruit_scd4x, read_adafruit_scd4x, request_adafruit_scd4x_sample
 from growmax.utils.wifi import ensure_wifi_connected
 
-# User's config file
-import config
-
 # set the random seed, so messages are randomized
 random.seed()
 
 
-def main():
-    boot_sequence()
+class GrowmaxState:
+    """Hardware handles and latest readings shared between the routine tasks."""
+
+    def __init__(self):
+        self.profiler = PhaseProfiler(enabled=settings.PROFILER_ENABLED)
+        self.water_sensor = None
+        if settings.WATER_SENSOR_LOW_ENABLED:
+            self.water_sensor = WaterLevelSensor(
+                Pin(get_gpio_for_mcu(settings.WATER_SENSOR_LOW), Pin.IN, Pin.PULL_DOWN),
+                debounce_ms=settings.WATER_SENSOR_DEBOUNCE_MS,
+            )
+        self.water_sensor_high = None
+        if settings.WATER_SENSOR_HIGH_ENABLED:
+            self.water_sensor_high = WaterLevelSensor(
+                Pin(get_gpio_for_mcu(settings.WATER_SENSOR_HIGH), Pin.IN, Pin.PULL_DOWN),
+                debounce_ms=settings.WATER_SENSOR_DEBOUNCE_MS,
+            )
+        self.relay_board = initialize_relay_board()
+        self.scd40x = None
+        self.atlas_ph = None
+
+        window_ms = settings.MOISTURE_SAMPLE_WINDOW_MS
+        backend = settings.MOISTURE_COUNTER_BACKEND
+        filter_mode = settings.MOISTURE_FILTER
+        filter_size = settings.MOISTURE_FILTER_SIZE
+        self.soil_sensors = MoistureArray(
+            channels=8, window_ms=window_ms, backend=backend, filter_mode=filter_mode, filter_size=filter_size
+        )
+        # Channels currently considered dry; cleared once the reading drops below threshold - hysteresis
+        self.dry = [False] * 8
+
+        self.pumps = [Pump(channel=1), Pump(channel=2), Pump(channel=3), Pump(channel=4),
+                      Pump(channel=5), Pump(channel=6), Pump(channel=7), Pump(channel=8)]
+        self.pump_scheduler = PumpScheduler(
+            self.pumps,
+            budget_ma=settings.PUMP_SUPPLY_BUDGET_MA,
+            pump_ma=settings.PUMP_CURRENT_MA,
+        )
+
+        # Dry-run cutoff: the water sensor's interrupt stops the pumps directly and wakes cutoff_task
+        self.cutoff_flag = asyncio.ThreadSafeFlag()
+        if self.water_sensor:
+            self.water_sensor.add_low_water_handler(self.pump_scheduler.halt_all)
+            self.water_sensor.add_low_water_handler(self.cutoff_flag.set)
+
+        self.soil_moisture = [0] * 8
+        self.ph_reading = None
+        self.temp, self.rh, self.ppm_carbon_dioxide = None, None, None
+        self.relay_refilled = False
+        self.relay_refill_duration = None
+        # Set while the refill valve was switched off but the relay board has not confirmed it
+        self.relay_refill_error = False
+
+    async def _init_scd4x(self):
+        if settings.ADAFRUIT_SCD4X_ENABLED and self.scd40x is None:
+            self.scd40x = await init_adafruit_scd4x(settings.ADAFRUIT_SCD4X_I2C_CHANNEL,
+                                                    settings.SENSOR_POLL_INTERVAL)
+
+    async def _init_atlas_ph(self):
+        if settings.ATLAS_PH_METER_ENABLED and self.atlas_ph is None:
+            try:
+                from growmax.atlas_ph.i2c import AtlasPHI2C
+                atlas_ph = AtlasPHI2C(settings.ATLAS_PH_I2C_CHANNEL)
+                # Ready once the EZO circuit answers with a valid status byte
+                await wait_ready(atlas_ph.probe, 2000)
+                self.atlas_ph = atlas_ph
+            except Exception as e:
+                print(f"Error initializing Atlas pH probe: {e}")
+
+    async def init_sensors(self):
+        """Initialize the enabled I2C sensors that are not initialized yet, concurrently."""
+        await asyncio.gather(self._init_scd4x(), self._init_atlas_ph())
+
+    @property
+    def has_water(self):
+        """Debounced reservoir level, or None when no water sensor is enabled."""
+        if self.water_sensor:
+            return self.water_sensor.has_water
+        return None
+
+
+def _can_pump(state):
+    # The low alarm is raised from the interrupt before the level has settled, so pumps stay off meanwhile
+    if settings.PUMP_WHEN_DRY:
+        return True
+    return state.has_water and not (state.water_sensor and state.water_sensor.low_alarm)
+
 
-    water_sensor = None
-    if get_config_value("WATER_SENSOR_LOW_ENABLED"):
-        water_sensor = Pin(get_gpio_for_mcu(config.WATER_SENSOR_LOW), Pin.IN, Pin.PULL_DOWN)
-    scd40x = None
-    atlas_ph = None
-    relay_board = initialize_relay_board()
+def _soaking(state, position, soak_time):
+    last_dose = state.pump_scheduler.last_dose_ms[position]
+    return last_dose is not None and utime.ticks_diff(utime.ticks_ms(), last_dose) < soak_time * 1000
 
-    soil_sensors = [Moisture(channel=1), Moisture(channel=2), Moisture(channel=3), Moisture(channel=4),
-                    Moisture(channel=5), Moisture(channel=6), Moisture(channel=7), Moisture(channel=8)]
-    pumps = [Pump(channel=1), Pump(channel=2), Pump(channel=3), Pump(channel=4),
-             Pump(channel=5), Pump(channel=6), Pump(channel=7), Pump(channel=8)]
 
+async def moisture_task(state):
+    """Scan the soil sensors and start a dose as soon as a channel reads dry.
+    Settings are read on every scan so a reload applies without restarting the task.
+    """
     while True:
-        utime.sleep(5.0)
+        start = state.profiler.start()
+        thresholds = settings.MOISTURE_THRESHOLDS
+        soak_time = settings.PUMP_SOAK_TIME
+        hysteresis = settings.MOISTURE_HYSTERESIS
+        state.soil_sensors.read_into(state.soil_moisture)
+        for position in range(8):
+            try:
+                reading = state.soil_sensors.filtered(position)
+                moisture_config = thresholds[position]
+                if reading >= moisture_config:
+                    state.dry[position] = True
+                elif reading < moisture_config - hysteresis:
+                    state.dry[position] = False
+                if (_can_pump(state) and state.dry[position]
+                        and not state.pump_scheduler.busy(position) and not _soaking(state, position, soak_time)):
+                    print("Position ", position + 1,
+                          " reservoir has water ", state.has_water,
+                          " and moisture value ", reading, "/", moisture_config)
+                    state.pump_scheduler.request(position, settings.PUMP_CYCLE_DURATION,
+                                                 priority=reading - moisture_config)
+            except Exception as e:
+                print("Exception: ", str(e))
+        state.profiler.stop(PHASE_MOISTURE, start)
+        await asyncio.sleep(settings.MOISTURE_SCAN_INTERVAL)
+
+
+async def pump_task(state):
+    """Start queued doses within the power budget and stop pumps whose dose has elapsed."""
+    while True:
+        start = state.profiler.start()
+        if not _can_pump(state):
+            state.pump_scheduler.clear_queue()
+        state.pump_scheduler.service()
+        state.profiler.stop(PHASE_DOSING, start)
+        await asyncio.sleep(0.1)
+
+
+async def cutoff_task(state):
+    """Finish a dry-run cutoff: drop queued doses and switch off relays other than the refill valve."""
+    while True:
+        await state.cutoff_flag.wait()
+        print("Reservoir is low; stopped all pumps")
+        state.pump_scheduler.clear_queue()
+        state.pump_scheduler.service()
+        # Keep switching the relays off until the board confirms it by readback
+        while state.relay_board:
+            try:
+                state.relay_board.all_off(keep=(settings.AUTO_REFILL_RELAY_POSITION,))
+            except Exception as e:
+                print("Exception: ", str(e))
+            if state.relay_board.confirmed:
+                break
+            await asyncio.sleep(0.5)
+
+
+async def wifi_task(state):
+    """Periodically re-check the Wi-Fi connection."""
+    while True:
+        start = state.profiler.start()
         try:
-            ensure_wifi_connected()
-            utime.sleep(0.5)
+            await ensure_wifi_connected()
         except Exception:
             # Potentially no wi-fi
             pass
+        state.profiler.stop(PHASE_WIFI, start)
+        if not settings.WIFI_ENABLED:
+            return
+        await asyncio.sleep(settings.WIFI_CHECK_INTERVAL)
 
-        if config.ADAFRUIT_SCD4X_ENABLED and scd40x is None:
-            scd40x = init_adafruit_scd4x(config.ADAFRUIT_SCD4X_I2C_CHANNEL)
 
-        if get_config_value("ATLAS_PH_METER_ENABLED"):
-            try:
-                atlas_ph = AtlasPHI2C(config.ATLAS_PH_I2C_CHANNEL)
-            except Exception as e:
-                print(f"Error initializing Atlas pH probe: {e}")
+def _reservoir_full(state):
+    return state.water_sensor_high is not None and state.water_sensor_high.has_water
+
+
+async def _close_refill_valve(state, relay_board, position):
+    # Switch the valve off until the board confirms it by readback; no new refill starts meanwhile
+    while True:
+        try:
+            relay_board.cancel(position)
+        except Exception as e:
+            print("Exception: ", str(e))
+        if relay_board.is_confirmed_off(position):
+            if state.relay_refill_error:
+                print("Refill valve confirmed closed")
+                state.relay_refill_error = False
+            return
+        if not state.relay_refill_error:
+            print("Refill valve not confirmed closed, retrying")
+            state.relay_refill_error = True
+        await asyncio.sleep(1)
 
-        soil_moisture = []
-        for position, soil_sensor in enumerate(soil_sensors):
+
+async def water_task(state):
+    """Refill the reservoir through the relay board when it runs low.
+    The refill valve is pulsed without blocking and closed early once the high water sensor reads full.
+    The task also closes it at AUTO_REFILL_DURATION itself, in case relay_task fails to service the board,
+    and keeps closing it until the board confirms it is off.
+    """
+    relay_board = state.relay_board
+    while True:
+        start = state.profiler.start()
+        relay_water_position = settings.AUTO_REFILL_RELAY_POSITION
+        for sensor in (state.water_sensor, state.water_sensor_high):
+            if sensor:
+                sensor.poll()
+        low_water = state.water_sensor and not state.has_water
+        state.profiler.stop(PHASE_WATER, start)
+        # Check if we need to refill the water reservoir
+        if low_water and relay_board and relay_water_position and not _reservoir_full(state):
+            start = state.profiler.start()
+            refill_started = utime.ticks_ms()
+            deadline = utime.ticks_add(refill_started, int(settings.AUTO_REFILL_DURATION * 1000))
             try:
-                pump_position = str(position + 1)
-                reading = soil_sensor.moisture
-                soil_moisture.append(reading)
-                has_water = water_sensor and statistically_has_water(water_sensor)
-                moisture_config = get_moisture_threshold_for_position(position)
-                print("Position ", pump_position,
-                      " reservoir has water ", has_water,
-                      " and moisture value ", reading, "/", moisture_config)
-                display_basic_stats(has_water, pump_position, reading, moisture_config)
-                if (config.PUMP_WHEN_DRY or has_water) and reading >= moisture_config:
-                    print("position: ", pump_position)
-                    pumps[position].dose(1, config.PUMP_CYCLE_DURATION)
-                utime.sleep(2)
+                relay_board.pulse(relay_water_position, settings.AUTO_REFILL_DURATION)
+                while relay_board.scheduled(relay_water_position):
+                    if _reservoir_full(state) or utime.ticks_diff(utime.ticks_ms(), deadline) >= 0:
+                        relay_board.cancel(relay_water_position)
+                        break
+                    await asyncio.sleep(0.1)
             except Exception as e:
                 print("Exception: ", str(e))
+            state.relay_refill_duration = utime.ticks_diff(utime.ticks_ms(), refill_started) // 1000
+            await _close_refill_valve(state, relay_board, relay_water_position)
+            state.relay_refilled = True
+            state.profiler.stop(PHASE_REFILL, start)
+        await asyncio.sleep(settings.WATER_CHECK_INTERVAL)
 
-        ph_reading = None
-        temp, rh, ppm_carbon_dioxide = None, None, None
-        # Check if we need to refill the water reservoir
-        has_water = water_sensor and statistically_has_water(water_sensor)
-        relay_water_position = get_config_value("AUTO_REFILL_RELAY_POSITION")
-        relay_refill_duration = get_config_value("AUTO_REFILL_DURATION", 45)
-        relay_refilled = False
-        if not has_water and relay_board and relay_water_position:
-            relay_board.turn_on(relay_water_position)
-            utime.sleep(relay_refill_duration)
-            relay_board.turn_off(relay_water_position)
-            relay_refilled = True
+
+async def relay_task(state):
+    """Apply the relay board's timed operations as they come due."""
+    while True:
+        try:
+            state.relay_board.service()
+        except Exception as e:
+            # Keep servicing so later timed switch-offs (ex: the refill valve) are still applied
+            print("Exception: ", str(e))
+        await asyncio.sleep(0.1)
+
+
+async def sensors_task(state):
+    """Poll the auxiliary SCD4x and Atlas pH sensors."""
+    while True:
+        await state.init_sensors()
+
+        try:
+            if state.scd40x:
+                # Wait for the sensor's next sample instead of polling before it is ready
+                request_adafruit_scd4x_sample(state.scd40x)
+                await asyncio.sleep(state.scd40x.ms_until_sample() / 1000)
+            # Start the pH conversion before the SCD4x read so the read overlaps with it
+            if state.atlas_ph:
+                ph_start = state.profiler.start()
+                state.atlas_ph.start_reading()
+            if state.scd40x:
+                start = state.profiler.start()
+                state.temp, state.rh, state.ppm_carbon_dioxide = read_adafruit_scd4x(state.scd40x)
+                state.profiler.stop(PHASE_SCD4X, start)
+            if state.atlas_ph:
+                while state.atlas_ph.reading_started:
+                    await asyncio.sleep(state.atlas_ph.remaining_ms() / 1000)
+                    reading = state.atlas_ph.collect_reading()
+                    if not state.atlas_ph.reading_started:
+                        state.ph_reading = reading
+                state.profiler.stop(PHASE_PH, ph_start)
+        except Exception as e:
+            print("Exception: ", str(e))
+        await asyncio.sleep(settings.SENSOR_POLL_INTERVAL)
+
+
+def _water_command(state, position, duration):
+    # Queue a remote WATER,<position 1-8>,<seconds> dose, logging why a command is rejected
+    try:
+        pos = int(position) - 1
+        duration = int(duration)
+    except ValueError:
+        print("Rejected WATER command: invalid position or duration", position, duration)
+        return
+    if not 0 <= pos < 8 or duration <= 0:
+        print("Rejected WATER command: position must be 1-8 and duration above 0", position, duration)
+    elif not _can_pump(state):
+        print("Rejected WATER command: reservoir is low")
+    else:
+        state.pump_scheduler.request(pos, duration, priority=PRIORITY_MANUAL)
+
+
+async def report_task(state):
+    """Report readings to the OpenSensor.io API and execute any pending remote commands.
+    Commands: ``WATER,<position>,<seconds>`` and ``CONFIG,<setting>,<JSON value>``.
+    """
+    while True:
+        await asyncio.sleep(settings.REPORT_INTERVAL)
+        # Pick up edits to config.json without a reboot
+        reload_if_changed()
+        start = state.profiler.start()
         # Check if we have any remote commands to execute
-        if get_config_value("OPEN_SENSOR_RETRIEVE_COMMANDS") and (config.PUMP_WHEN_DRY or has_water):
+        if settings.OPEN_SENSOR_RETRIEVE_COMMANDS:
             command_parts = api.retrieve_command()  # Experimental
             if command_parts and len(command_parts) == 3 and command_parts[0] == "WATER":
-                pos = int(command_parts[1]) - 1
-                duration = int(command_parts[2])
-                pumps[pos].dose(1, duration)
-        # Check other sensors
-        if atlas_ph:
-            utime.sleep(1.0)
-            ph_reading = atlas_ph.obtain_ph_reading()
-        if scd40x:
-            temp, rh, ppm_carbon_dioxide = read_adafruit_scd4x(scd40x)
-        if config.OPEN_SENSOR_COLLECT_DATA:
+                _water_command(state, command_parts[1], command_parts[2])
+            elif command_parts and len(command_parts) >= 3 and command_parts[0] == "CONFIG":
+                # The value may itself contain commas, ex: a list of thresholds
+                apply_config_command(command_parts[1], ",".join(command_parts[2:]))
+            elif command_parts:
+                print("Unknown remote command:", ",".join(command_parts))
+            # Let the other tasks run between the (blocking) HTTP requests
+            state.profiler.stop(PHASE_REPORT, start)
+            await asyncio.sleep(0)
+            start = state.profiler.start()
+        if settings.OPEN_SENSOR_COLLECT_DATA:
             report_data = api.get_device_metadata()
             report_data["liquid"] = {
-                "liquid": has_water
+                "liquid": state.has_water
             }
             report_data["moisture"] = {
-                "readings": soil_moisture
+                "readings": state.soil_moisture
             }
-            if scd40x:
-                api.add_adafruit_scd4x_data_to_report(report_data, temp, rh, ppm_carbon_dioxide)
-            if atlas_ph and ph_reading:
+            if state.scd40x:
+                api.add_adafruit_scd4x_data_to_report(report_data, state.temp, state.rh, state.ppm_carbon_dioxide)
+            if state.atlas_ph and state.ph_reading:
                 report_data["pH"] = {
-                    "pH": ph_reading
+                    "pH": state.ph_reading
                 }
-            if relay_refilled:
+            if state.relay_refilled or state.relay_refill_error:
                 report_data["relays"] = {
                     "relays": [
                         {
-                            "position": relay_water_position,
+                            "position": settings.AUTO_REFILL_RELAY_POSITION,
                             "enabled": True,
-                            "seconds": relay_refill_duration,
-                            "description": "Auto refill water reservoir"
+                            "seconds": state.relay_refill_duration,
+                            "description": ("Auto refill valve not confirmed closed" if state.relay_refill_error
+                                            else "Auto refill water reservoir")
                         }
                     ]
                 }
+            if state.profiler.enabled:
+                report_data["profile"] = state.profiler.summary()
             api.report_environment_data(report_data)
-        if scd40x:
-            display_scd4x_reading(temp, rh, ppm_carbon_dioxide)
-            utime.sleep(3)
-        if atlas_ph:
-            display_ph_reading(ph_reading)
-            utime.sleep(3)
-
-        print("Completed iteration; soil_moisture's = ", str(soil_moisture))
+        state.relay_refilled = False
+        state.profiler.stop(PHASE_REPORT, start)
+
+        print("Completed iteration; soil_moisture's = ", str(state.soil_moisture))
         print("Free mem before garbage collection: ", str(gc.mem_free()))
         gc.collect()
         print("Free mem after garbage collection: ", str(gc.mem_free()))
+
+
+async def _cycle_screens(state):
+    # Show the channel, SCD4x and pH screens in turn, stopping early if the display is switched off
+    for screen in range(10):
+        if screen == 8 and not (state.scd40x and state.ppm_carbon_dioxide is not None):
+            continue
+        if screen == 9 and not state.atlas_ph:
+            continue
+        if not sync_display_power():
+            return
+        start = state.profiler.start()
+        if screen < 8:
+            display_basic_stats(state.has_water, str(screen + 1), state.soil_moisture[screen],
+                                settings.MOISTURE_THRESHOLDS[screen])
+        elif screen == 8:
+            display_scd4x_reading(state.temp, state.rh, state.ppm_carbon_dioxide)
+        else:
+            display_ph_reading(state.ph_reading)
+        state.profiler.stop(PHASE_DISPLAY, start)
+        await wait_display_change(settings.DISPLAY_SCREEN_DURATION)
+
+
+async def display_task(state):
+    """Cycle the display through the channel, SCD4x and pH screens, or keep the dashboard up to date.
+    While the display is off nothing is drawn; the readings in state are rendered once it is switched on.
+    """
+    # Let the other tasks take their first readings before the display is set up
+    await asyncio.sleep(0)
+    init_display()
+    if settings.DISPLAY_SPLASH_DURATION and show_splash():
+        await asyncio.sleep(settings.DISPLAY_SPLASH_DURATION)
+    while True:
+        if not sync_display_power():
+            await wait_display_change()
+            continue
+        if settings.DISPLAY_DASHBOARD:
+            start = state.profiler.start()
+            display_dashboard(state.has_water, state.soil_moisture, state.dry, state.ppm_carbon_dioxide,
+                              state.temp, state.rh, state.ph_reading)
+            state.profiler.stop(PHASE_DISPLAY, start)
+            await wait_display_change(settings.DISPLAY_SCREEN_DURATION)
+        else:
+            await _cycle_screens(state)
+
+
+async def run():
+    state = GrowmaxState()
+    if settings.I2C_AUTO_TUNE:
+        # Every device must be initialized first so its probe is registered
+        init_display()
+        await state.init_sensors()
+        try:
+            calibrate_all()
+        except Exception as e:
+            print(f"I2C calibration failed: {e}")
+    # Moisture and pump tasks first, so the first watering decision does not wait for Wi-Fi or the sensors
+    asyncio.create_task(moisture_task(state))
+    asyncio.create_task(pump_task(state))
+    asyncio.create_task(cutoff_task(state))
+    if state.relay_board:
+        asyncio.create_task(relay_task(state))
+    asyncio.create_task(water_task(state))
+    asyncio.create_task(wifi_task(state))
+    asyncio.create_task(sensors_task(state))
+    asyncio.create_task(report_task(state))
+    await display_task(state)
+
+
+def main():
+    asyncio.run(run())
@@ -40,6 +40,7 @@ _SCD4X_STOPPERIODICMEASUREMENT = const(0x3F86)
 _SCD4X_STARTPERIODICMEASUREMENT = const(0x21B1)
 _SCD4X_STARTLOWPOWERPERIODICMEASUREMENT = const(0x21AC)
 _SCD4X_READMEASUREMENT = const(0xEC05)
+_SCD4X_MEASURESINGLESHOT = const(0x219D)
 _SCD4X_SERIALNUMBER = const(0x3682)
 _SCD4X_GETTEMPOFFSET = const(0x2318)
 _SCD4X_SETTEMPOFFSET = const(0x241D)
@@ -50,6 +51,31 @@ _SCD4X_PERSISTSETTINGS = const(0x3615)
 _SCD4X_GETASCE = const(0x2313)
 _SCD4X_SETASCE = const(0x2416)
 
+# Times a read command is re-issued when its reply fails the CRC check
+CRC_RETRIES = const(2)
+
+
+def _make_crc_table() -> bytes:
+    # Sensirion CRC8 (polynomial 0x31) of every byte value, so each byte costs one lookup
+    table = bytearray(256)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 0x80:
+                crc = (crc << 1) ^ 0x31
+            else:
+                crc = crc << 1
+        table[i] = crc & 0xFF
+    return bytes(table)
+
+
+_CRC_TABLE = _make_crc_table()
+
+# Time between samples in periodic and low power periodic measurement modes
+PERIODIC_INTERVAL_MS = const(5000)
+LOW_POWER_PERIODIC_INTERVAL_MS = const(30000)
+SINGLE_SHOT_MS = const(5000)
+
 
 class SCD4X:
     """
@@ -81,12 +107,20 @@ class SCD4X:
         self.i2c_address = address
         self._buffer = bytearray(18)
         self._cmd = bytearray(2)
-        self._crc_buffer = bytearray(2)
+        # Views of the buffer for the reply sizes used and for a command with a value, so I/O does not slice
+        buffer_mv = memoryview(self._buffer)
+        self._reply_3 = buffer_mv[:3]
+        self._reply_9 = buffer_mv[:9]
+        self._cmd_value = buffer_mv[:5]
 
         # cached readings
         self._temperature = None
         self._relative_humidity = None
         self._co2 = None
+        # Sample period of the current measurement mode (None when idle), and when the last sample was read
+        self._interval_ms = None
+        self._last_sample_ms = None
+        self.single_shot = False
 
         self.stop_periodic_measurement()
 
@@ -120,6 +154,23 @@ class SCD4X:
             self._read_data()
         return self._relative_humidity
 
+    def read_measurement(self) -> Tuple[int, float, float]:
+        """Returns (CO2, temperature, relative humidity) read with a single ``_read_data``.
+        Until the next sample is due (see :meth:`ms_until_sample`) the cached values are returned
+        without any I2C traffic; all three are None before the first sample.
+        """
+        if self.ms_until_sample() == 0 and self.data_ready:
+            self._read_data()
+        return self._co2, self._temperature, self._relative_humidity
+
+    def ms_until_sample(self) -> int:
+        """Milliseconds until the sensor is expected to have a new sample, based on when the
+        last one was read and the period of the measurement mode. 0 if one may be ready now."""
+        if self._interval_ms is None or self._last_sample_ms is None:
+            return 0
+        elapsed = time.ticks_diff(time.ticks_ms(), self._last_sample_ms)
+        return max(0, self._interval_ms - elapsed)
+
     def reinit(self) -> None:
         """Reinitializes the sensor by reloading user settings from EEPROM."""
         self.stop_periodic_measurement()
@@ -137,7 +188,7 @@ class SCD4X:
         self._set_command_value(_SCD4X_FORCEDRECAL, target_co2)
         time.sleep(0.5)
         self._read_reply(self._buffer, 3)
-        correction = struct.unpack_from(">h", self._buffer[0:2])[0]
+        correction = struct.unpack_from(">h", self._buffer)[0]
         if correction == 0xFFFF:
             raise RuntimeError(
                 "Forced recalibration failed.\
@@ -153,8 +204,7 @@ class SCD4X:
             This value will NOT be saved and will be reset on boot unless
             saved with persist_settings().
         """
-        self._send_command(_SCD4X_GETASCE, cmd_delay=0.001)
-        self._read_reply(self._buffer, 3)
+        self._read_command(_SCD4X_GETASCE, 3)
         return self._buffer[1] == 1
 
     @self_calibration_enabled.setter
@@ -171,26 +221,24 @@ class SCD4X:
 
     def _read_data(self) -> None:
         """Reads the temp/hum/co2 from the sensor and caches it"""
-        self._send_command(_SCD4X_READMEASUREMENT, cmd_delay=0.001)
-        self._read_reply(self._buffer, 9)
+        self._read_command(_SCD4X_READMEASUREMENT, 9)
         self._co2 = (self._buffer[0] << 8) | self._buffer[1]
         temp = (self._buffer[3] << 8) | self._buffer[4]
         self._temperature = -45 + 175 * (temp / 2**16)
         humi = (self._buffer[6] << 8) | self._buffer[7]
         self._relative_humidity = 100 * (humi / 2**16)
+        self._last_sample_ms = time.ticks_ms()
 
     @property
     def data_ready(self) -> bool:
         """Check the sensor to see if new data is available"""
-        self._send_command(_SCD4X_DATAREADY, cmd_delay=0.001)
-        self._read_reply(self._buffer, 3)
+        self._read_command(_SCD4X_DATAREADY, 3)
         return not ((self._buffer[0] & 0x07 == 0) and (self._buffer[1] == 0))
 
     @property
     def serial_number(self) -> Tuple[int, int, int, int, int, int]:
         """Request a 6-tuple containing the unique serial number for this sensor"""
-        self._send_command(_SCD4X_SERIALNUMBER, cmd_delay=0.001)
-        self._read_reply(self._buffer, 9)
+        self._read_command(_SCD4X_SERIALNUMBER, 9)
         return (
             self._buffer[0],
             self._buffer[1],
@@ -203,6 +251,8 @@ class SCD4X:
     def stop_periodic_measurement(self) -> None:
         """Stop measurement mode"""
         self._send_command(_SCD4X_STOPPERIODICMEASUREMENT, cmd_delay=0.5)
+        self._interval_ms = None
+        self.single_shot = False
 
     def start_periodic_measurement(self) -> None:
         """Put sensor into working mode, about 5s per measurement
@@ -219,6 +269,7 @@ class SCD4X:
             * :meth:`set_ambient_pressure() <adafruit_scd4x.SCD4X.set_ambient_pressure>`
         """
         self._send_command(_SCD4X_STARTPERIODICMEASUREMENT)
+        self._start_interval(PERIODIC_INTERVAL_MS)
 
     def start_low_periodic_measurement(self) -> None:
         """Put sensor into low power working mode, about 30s per measurement. See
@@ -226,6 +277,20 @@ class SCD4X:
         for more details.
         """
         self._send_command(_SCD4X_STARTLOWPOWERPERIODICMEASUREMENT)
+        self._start_interval(LOW_POWER_PERIODIC_INTERVAL_MS)
+
+    def measure_single_shot(self) -> None:
+        """Start a single measurement while the sensor is idle (SCD41 only). The result can be
+        read with :meth:`read_measurement` once :meth:`ms_until_sample` reaches 0, about 5s later.
+        """
+        self._send_command(_SCD4X_MEASURESINGLESHOT)
+        self.single_shot = True
+        self._start_interval(SINGLE_SHOT_MS)
+
+    def _start_interval(self, interval_ms: int) -> None:
+        # The first sample of a measurement mode arrives one period after it starts
+        self._interval_ms = interval_ms
+        self._last_sample_ms = time.ticks_ms()
 
     def persist_settings(self) -> None:
         """Save temperature offset, altitude offset, and selfcal enable settings to EEPROM"""
@@ -246,8 +311,7 @@ class SCD4X:
             This value will NOT be saved and will be reset on boot unless saved with
             persist_settings().
         """
-        self._send_command(_SCD4X_GETTEMPOFFSET, cmd_delay=0.001)
-        self._read_reply(self._buffer, 3)
+        self._read_command(_SCD4X_GETTEMPOFFSET, 3)
         temp = (self._buffer[0] << 8) | self._buffer[1]
         return 175.0 * temp / 2**16
 
@@ -269,8 +333,7 @@ class SCD4X:
             This value will NOT be saved and will be reset on boot unless saved with
             persist_settings().
         """
-        self._send_command(_SCD4X_GETALTITUDE, cmd_delay=0.001)
-        self._read_reply(self._buffer, 3)
+        self._read_command(_SCD4X_GETALTITUDE, 3)
         return (self._buffer[0] << 8) | self._buffer[1]
 
     @altitude.setter
@@ -279,12 +342,12 @@ class SCD4X:
             raise AttributeError("Height must be less than or equal to 65535 meters")
         self._set_command_value(_SCD4X_SETALTITUDE, height)
 
-    def _check_buffer_crc(self, buf: bytearray) -> bool:
-        for i in range(0, len(buf), 3):
-            self._crc_buffer[0] = buf[i]
-            self._crc_buffer[1] = buf[i + 1]
-            if self._crc8(self._crc_buffer) != buf[i + 2]:
-                raise RuntimeError("CRC check failed while reading data")
+    def _check_buffer_crc(self, buf: bytearray, num: int) -> bool:
+        """Check the CRC of each 2-byte word in the first num bytes of buf, without copying"""
+        table = _CRC_TABLE
+        for i in range(0, num, 3):
+            if table[table[0xFF ^ buf[i]] ^ buf[i + 1]] != buf[i + 2]:
+                return False
         return True
 
     def _send_command(self, cmd: int, cmd_delay: float = 0) -> None:
@@ -303,24 +366,38 @@ class SCD4X:
     def _set_command_value(self, cmd, value, cmd_delay=0):
         self._buffer[0] = (cmd >> 8) & 0xFF
         self._buffer[1] = cmd & 0xFF
-        self._crc_buffer[0] = self._buffer[2] = (value >> 8) & 0xFF
-        self._crc_buffer[1] = self._buffer[3] = value & 0xFF
-        self._buffer[4] = self._crc8(self._crc_buffer)
-        self.i2c_bus.write(self.i2c_address, self._buffer)
+        self._buffer[2] = (value >> 8) & 0xFF
+        self._buffer[3] = value & 0xFF
+        self._buffer[4] = _CRC_TABLE[_CRC_TABLE[0xFF ^ self._buffer[2]] ^ self._buffer[3]]
+        self.i2c_bus.writeto(self.i2c_address, self._cmd_value)
         time.sleep(cmd_delay)
 
     def _read_reply(self, buff, num):
-        self.i2c_bus.readfrom_into(self.i2c_address, buff)
-        self._check_buffer_crc(self._buffer[0:num])
+        if buff is self._buffer and num == 3:
+            reply = self._reply_3
+        elif buff is self._buffer and num == 9:
+            reply = self._reply_9
+        else:
+            reply = memoryview(buff)[:num]
+        self.i2c_bus.readfrom_into(self.i2c_address, reply)
+        if not self._check_buffer_crc(buff, num):
+            raise RuntimeError("CRC check failed while reading data")
+
+    def _read_command(self, cmd, num, cmd_delay=0.001):
+        """Send a read command and read its reply into the buffer, re-issuing it if the reply
+        fails the CRC check (ex: noise at higher bus speeds)"""
+        for attempt in range(CRC_RETRIES + 1):
+            self._send_command(cmd, cmd_delay=cmd_delay)
+            try:
+                self._read_reply(self._buffer, num)
+                return
+            except RuntimeError:
+                if attempt == CRC_RETRIES:
+                    raise
 
     @staticmethod
     def _crc8(buffer: bytearray) -> int:
         crc = 0xFF
         for byte in buffer:
-            crc ^= byte
-            for _ in range(8):
-                if crc & 0x80:
-                    crc = (crc << 1) ^ 0x31
-                else:
-                    crc = crc << 1
-        return crc & 0xFF  # return the bottom 8 bits# Write your code here :-)
+            crc = _CRC_TABLE[crc ^ byte]
+        return crc
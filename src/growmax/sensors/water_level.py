@@ -0,0 +1,77 @@
+from machine import Pin, Timer
+import micropython
+import utime
+
+
+class WaterLevelSensor:
+    """ Track a digital liquid level sensor with pin interrupts.
+    ``has_water`` only changes, in either direction, once the pin has settled for ``debounce_ms``,
+    so a splash or a noise edge does not start a refill.
+    A possible loss of water is still acted on immediately from the hard interrupt: ``low_alarm`` is
+    set and the low water handlers run (ex: stopping the pumps); the alarm clears if water settles back.
+    Reading ``has_water`` is just an attribute lookup.
+    On ports without virtual timers (ex: ESP32) the debounce is applied by calling ``poll`` regularly.
+    """
+
+    def __init__(self, pin, debounce_ms=1000):
+        self.pin = pin
+        self.debounce_ms = debounce_ms
+        # The Optomax sensors pull the pin low when liquid is present
+        self.has_water = not pin.value()
+        self.low_alarm = not self.has_water
+        self.last_changed_ms = utime.ticks_ms()
+        try:
+            self.debounce_timer = Timer(-1)
+        except (ValueError, TypeError):
+            # No virtual timers on this port; poll() applies the settled level instead
+            self.debounce_timer = None
+        self._settle_at = None
+        self._low_water_handlers = []
+        # Bound method created once, so scheduling it from the hard IRQ does not allocate
+        self._start_debounce_ref = self._start_debounce
+        try:
+            self.pin.irq(handler=self._level_change, trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING, hard=True)
+        except (TypeError, ValueError):
+            self.pin.irq(handler=self._level_change, trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING)
+
+    def value(self):
+        return self.has_water
+
+    def add_low_water_handler(self, handler):
+        """Call handler() from the interrupt as soon as the reservoir runs low.
+        Handlers run in hard interrupt context: they must not allocate memory or block.
+        """
+        self._low_water_handlers.append(handler)
+
+    def _level_change(self, pin):
+        if pin.value() and not self.low_alarm:
+            self.low_alarm = True
+            for i in range(len(self._low_water_handlers)):
+                self._low_water_handlers[i]()
+        try:
+            micropython.schedule(self._start_debounce_ref, 0)
+        except RuntimeError:
+            # Schedule queue full; the next edge restarts the debounce
+            pass
+
+    def _start_debounce(self, _):
+        if self.debounce_timer is None:
+            self._settle_at = utime.ticks_add(utime.ticks_ms(), self.debounce_ms)
+        else:
+            self.debounce_timer.init(period=self.debounce_ms, mode=Timer.ONE_SHOT, callback=self._level_settled)
+
+    def poll(self):
+        """Apply a level change once it has settled, when there is no debounce timer."""
+        if self._settle_at is not None and utime.ticks_diff(utime.ticks_ms(), self._settle_at) >= 0:
+            self._settle_at = None
+            self._level_settled(None)
+
+    def _level_settled(self, _):
+        has_water = not self.pin.value()
+        self.low_alarm = not has_water
+        if has_water != self.has_water:
+            self.has_water = has_water
+            self.last_changed_ms = utime.ticks_ms()
+
+    def ms_since_change(self):
+        return utime.ticks_diff(utime.ticks_ms(), self.last_changed_ms)
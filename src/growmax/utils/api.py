@@ -1,8 +1,7 @@
 import machine
 import ubinascii
-import time
 
-import config
+from growmax.utils.configs import settings
 
 headers = {'content-type': 'application/json'}
 
@@ -10,13 +9,11 @@ headers = {'content-type': 'application/json'}
 def get_device_metadata():
     report_data = {}
     try:
-        time.sleep(1.0)
         device_id = ubinascii.hexlify(machine.unique_id()).decode()
-        time.sleep(1.0)
         report_data["device_metadata"] = {
             "device_id": device_id,
-            "name": config.DEVICE_NAME,
-            "api_key": config.OPEN_SENSOR_API_KEY,
+            "name": settings.DEVICE_NAME,
+            "api_key": settings.OPEN_SENSOR_API_KEY,
         }
     except Exception as e:
         print(e)
@@ -44,7 +41,6 @@ def report_environment_data(report_data):
     try:
         import urequests
         import json
-        time.sleep(1.0)
         resp = urequests.post(
             "https://api.opensensor.io/environment/",
             headers=headers,
@@ -60,7 +56,6 @@ def retrieve_command():
     try:
         import urequests
         import json
-        time.sleep(1.0)
         metadata = get_device_metadata()
         metadata["device_id"] = metadata["device_metadata"]["device_id"]
         metadata["name"] = metadata["device_metadata"]["name"]
@@ -1,14 +1,317 @@
+import json
+import os
+
 import config  # User's config file
 
 
+# Settings changed at run time (ex: remote CONFIG commands) are stored here and applied over config.py
+OVERRIDES_FILE = "config.json"
+
+
+def _bool(value):
+    if value is True or value is False or value is None:
+        return bool(value)
+    raise ValueError("expected True or False")
+
+
+def _int(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError("expected an integer")
+    return value
+
+
+def _positive_int(value):
+    if _int(value) <= 0:
+        raise ValueError("expected an integer above 0")
+    return value
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("expected a number")
+    return value
+
+
+def _non_negative(value):
+    if _number(value) < 0:
+        raise ValueError("expected a number of at least 0")
+    return value
+
+
+def _positive(value):
+    if _number(value) <= 0:
+        raise ValueError("expected a number above 0")
+    return value
+
+
+def _str(value):
+    if not isinstance(value, str):
+        raise ValueError("expected a string")
+    return value
+
+
+def _any(value):
+    return value
+
+
+def _optional(validate):
+    def optional(value):
+        return None if value is None else validate(value)
+    return optional
+
+
+def _choice(*choices):
+    def choice(value):
+        if value not in choices:
+            raise ValueError("expected one of " + ", ".join(repr(c) for c in choices))
+        return value
+    return choice
+
+
+def _position(value):
+    if not 1 <= _int(value) <= 8:
+        raise ValueError("expected a position from 1 to 8")
+    return value
+
+
+def _threshold(value):
+    if isinstance(value, (list, tuple)):
+        if len(value) != 8:
+            raise ValueError("expected a number or a list of 8 numbers")
+        for threshold in value:
+            _non_negative(threshold)
+        return tuple(value)
+    return _non_negative(value)
+
+
+_channel = _choice(0, 1)
+
+# Whether reload_settings can change a setting: LIVE ones are read by the routine on every loop,
+# RESTART ones only when drivers and tasks are set up at boot
+LIVE = True
+RESTART = False
+
+# Every setting: name, default when config.py does not define it, validator (raises ValueError), LIVE/RESTART
+_SCHEMA = (
+    ("GROWMAX_MCU", "RP2040", _str, RESTART),
+    ("SOIL_WET_THRESHOLD", 10, _threshold, LIVE),
+    ("MOISTURE_SAMPLE_WINDOW_MS", 500, _positive_int, RESTART),
+    ("MOISTURE_COUNTER_BACKEND", "IRQ", _choice("IRQ", "PIO", "SIMULATED"), RESTART),
+    ("MOISTURE_FILTER", "median", _choice("median", "ema", "trimmed_mean"), RESTART),
+    ("MOISTURE_FILTER_SIZE", 5, _positive_int, RESTART),
+    ("MOISTURE_HYSTERESIS", 1, _non_negative, LIVE),
+    ("WATER_SENSOR_LOW_ENABLED", False, _bool, RESTART),
+    ("WATER_SENSOR_LOW", 22, _int, RESTART),
+    ("WATER_SENSOR_DEBOUNCE_MS", 1000, _positive_int, RESTART),
+    ("WATER_SENSOR_HIGH_ENABLED", False, _bool, RESTART),
+    ("WATER_SENSOR_HIGH", 21, _int, RESTART),
+    ("PUMP_WHEN_DRY", False, _bool, LIVE),
+    ("PUMP_CYCLE_DURATION", 30, _positive, LIVE),
+    ("PUMP_SUPPLY_BUDGET_MA", 200, _positive_int, RESTART),
+    ("PUMP_CURRENT_MA", 200, _positive_int, RESTART),
+    ("RELAY_BOARD_ENABLED", False, _bool, RESTART),
+    ("RELAY_BOARD_I2C_CHANNEL", 0, _channel, RESTART),
+    ("RELAY_BOARD_NUM_RELAYS", 4, _choice(4, 8), RESTART),
+    ("RELAY_BOARD_I2C_ADDRESS", 0x27, _int, RESTART),
+    ("AUTO_REFILL_RELAY_POSITION", None, _optional(_position), LIVE),
+    ("AUTO_REFILL_DURATION", 45, _positive, LIVE),
+    ("I2C_FREQ", 100000, _positive_int, RESTART),
+    ("I2C_AUTO_TUNE", False, _bool, RESTART),
+    ("ADAFRUIT_SCD4X_ENABLED", False, _bool, RESTART),
+    ("ADAFRUIT_SCD4X_I2C_CHANNEL", 0, _channel, RESTART),
+    ("ADAFRUIT_SCD4X_MODE", None, _optional(_choice("periodic", "low_power", "single_shot")), RESTART),
+    ("ATLAS_PH_METER_ENABLED", False, _bool, RESTART),
+    ("ATLAS_PH_I2C_CHANNEL", 0, _channel, RESTART),
+    ("ATLAS_PH_METER_ADDRESS", None, _optional(_int), RESTART),
+    ("DISPLAY", None, _optional(_choice("SSD1327_I2C", "SH1107_I2C")), RESTART),
+    ("DISPLAY_I2C_CHANNEL", 0, _channel, RESTART),
+    ("DISPLAY_I2C_ADDRESS", None, _optional(_int), RESTART),
+    ("DISPLAY_SWITCH", None, _optional(_int), RESTART),
+    ("DISPLAY_SWITCH_CLASS", None, _optional(_choice("MotionSensor")), RESTART),
+    ("DISPLAY_SWITCH_DURATION_MS", 10000, _positive_int, RESTART),
+    ("DISPLAY_SWITCH_PULL", None, _any, RESTART),
+    ("DISPLAY_SWITCH_TRIGGER", None, _any, RESTART),
+    ("DISPLAY_SPLASH_DURATION", 5, _non_negative, RESTART),
+    ("DISPLAY_DASHBOARD", False, _bool, LIVE),
+    ("MOISTURE_SCAN_INTERVAL", 1, _positive, LIVE),
+    ("WATER_CHECK_INTERVAL", 5, _positive, LIVE),
+    ("SENSOR_POLL_INTERVAL", 60, _positive, LIVE),
+    ("REPORT_INTERVAL", 60, _positive, LIVE),
+    ("WIFI_CHECK_INTERVAL", 30, _positive, LIVE),
+    ("DISPLAY_SCREEN_DURATION", 3, _positive, LIVE),
+    ("PUMP_SOAK_TIME", 60, _non_negative, LIVE),
+    ("PROFILER_ENABLED", False, _bool, RESTART),
+    ("WIFI_ENABLED", False, _bool, RESTART),
+    ("WIFI_SSID", "", _str, RESTART),
+    ("WIFI_PASSWORD", "", _str, RESTART),
+    ("OPEN_SENSOR_COLLECT_DATA", False, _bool, LIVE),
+    ("OPEN_SENSOR_API_KEY", None, _optional(_str), RESTART),
+    ("DEVICE_NAME", "", _str, RESTART),
+    ("OPEN_SENSOR_RETRIEVE_COMMANDS", False, _bool, LIVE),
+)
+_KEYS = {key: None for key, _, _, _ in _SCHEMA}
+
+# Settings the remote CONFIG command may change; credentials, pins and devices stay local
+REMOTE_KEYS = (
+    "SOIL_WET_THRESHOLD",
+    "MOISTURE_HYSTERESIS",
+    "PUMP_CYCLE_DURATION",
+    "PUMP_SOAK_TIME",
+    "AUTO_REFILL_DURATION",
+    "MOISTURE_SCAN_INTERVAL",
+    "WATER_CHECK_INTERVAL",
+    "SENSOR_POLL_INTERVAL",
+    "REPORT_INTERVAL",
+    "DISPLAY_SCREEN_DURATION",
+)
+
+
+class Settings:
+    """ Validated, normalized snapshot of config.py with the overrides from config.json applied.
+    Attribute names match the config.py settings, plus ``MOISTURE_THRESHOLDS``: the threshold of
+    each of the 8 channels.  Read attributes directly in loops instead of ``get_config_value``.
+    """
+    __slots__ = tuple(_KEYS) + ("MOISTURE_THRESHOLDS",)
+
+
+def _build(overrides):
+    """Return a new Settings from config.py and overrides, or raise ValueError listing every invalid setting."""
+    settings = Settings()
+    errors = []
+    for key in overrides:
+        if key not in _KEYS:
+            errors.append(key + ": unknown setting")
+    for key, default, validate, _ in _SCHEMA:
+        value = overrides[key] if key in overrides else getattr(config, key, default)
+        try:
+            setattr(settings, key, validate(value))
+        except ValueError as e:
+            errors.append(key + ": " + str(e))
+    if errors:
+        raise ValueError("Invalid config: " + "; ".join(errors))
+    threshold = settings.SOIL_WET_THRESHOLD
+    settings.MOISTURE_THRESHOLDS = threshold if isinstance(threshold, tuple) else (threshold,) * 8
+    return settings
+
+
+def _load_overrides():
+    try:
+        with open(OVERRIDES_FILE) as f:
+            overrides = json.load(f)
+    except OSError:
+        return {}
+    except ValueError:
+        print("Ignoring invalid", OVERRIDES_FILE)
+        return {}
+    return overrides if isinstance(overrides, dict) else {}
+
+
+def _overrides_stamp():
+    # Size and modification time of config.json, or None if there is none
+    try:
+        stat = os.stat(OVERRIDES_FILE)
+    except OSError:
+        return None
+    return stat[6], stat[8]
+
+
+def _save_overrides(overrides):
+    global _stamp
+    # Write a temporary file first so a reset mid-write cannot leave a truncated config.json
+    temp_file = OVERRIDES_FILE + ".tmp"
+    with open(temp_file, "w") as f:
+        json.dump(overrides, f)
+    os.rename(temp_file, OVERRIDES_FILE)
+    _stamp = _overrides_stamp()
+
+
+def _warn_unknown_settings():
+    for key in dir(config):
+        if key.isupper() and key not in _KEYS:
+            print("Unknown config setting (typo?):", key)
+
+
+def _load():
+    overrides = _load_overrides()
+    try:
+        return _build(overrides)
+    except ValueError as e:
+        if not overrides:
+            raise
+        # A bad config.json must not keep the device from running on its config.py
+        print(e, "- ignoring", OVERRIDES_FILE)
+        return _build({})
+
+
+# Validated once at boot: an invalid config.py fails here with every problem listed
+_stamp = _overrides_stamp()
+settings = _load()
+_warn_unknown_settings()
+
+
+def reload_settings(changes=None, persist=False):
+    """Re-read config.json, apply changes on top and replace the current settings in one step.
+    Nothing changes if any value is invalid or a RESTART setting would change (ex: pins, I2C devices,
+    the moisture filter, credentials); edit those in config.py and reset.
+    Returns True if the new settings were applied.
+    :param changes: Dict of setting name to new value
+    :param persist: Store changes in config.json so they survive a reset
+    """
+    overrides = _load_overrides()
+    if changes:
+        overrides.update(changes)
+    try:
+        new_settings = _build(overrides)
+    except ValueError as e:
+        print(e)
+        return False
+    restart = [key for key, _, _, live in _SCHEMA if not live and getattr(new_settings, key) != getattr(settings, key)]
+    if restart:
+        print("Settings require a restart, not applied:", ", ".join(restart))
+        return False
+    # No awaits while copying, so tasks never see a mix of old and new values
+    for key in Settings.__slots__:
+        setattr(settings, key, getattr(new_settings, key))
+    if persist and changes:
+        try:
+            _save_overrides(overrides)
+        except OSError as e:
+            print("Unable to store", OVERRIDES_FILE, e)
+    return True
+
+
+def reload_if_changed():
+    """Reload the settings if config.json was edited, created or removed since it was last read.
+    Only stats the file, so tasks can call it periodically.  Returns True if new settings were applied.
+    """
+    global _stamp
+    stamp = _overrides_stamp()
+    if stamp == _stamp:
+        return False
+    _stamp = stamp
+    print(OVERRIDES_FILE, "changed, reloading settings")
+    return reload_settings()
+
+
+def apply_config_command(key, value):
+    """Apply a remote ``CONFIG,<setting>,<JSON value>`` command and persist it.
+    Only the settings in REMOTE_KEYS can be changed remotely.
+    """
+    if key not in REMOTE_KEYS:
+        print("Remote changes to", key, "are not allowed")
+        return False
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass  # Plain strings, ex: a Wi-Fi SSID
+    return reload_settings({key: value}, persist=True)
+
+
 def get_config_value(key, default=None):
-    if hasattr(config, key):
-        return getattr(config, key)
-    return default
+    if key in _KEYS:
+        return getattr(settings, key)
+    return getattr(config, key, default)
 
 
 def get_moisture_threshold_for_position(position):
-    if isinstance(config.SOIL_WET_THRESHOLD, int):
-        return config.SOIL_WET_THRESHOLD
-    else:
-        return config.SOIL_WET_THRESHOLD[position]
+    return settings.MOISTURE_THRESHOLDS[position]
@@ -1,91 +1,147 @@
-import gc
 import machine
-import time
 
-from growmax.utils.mcu import get_gpio_for_mcu
-from growmax.sensors.motion import MotionSensor
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
 
-import config
+from growmax.utils.configs import settings
+from growmax.utils.i2c_bus import FAST_MODE, get_i2c_bus
+from growmax.utils.mcu import get_gpio_for_mcu
 
 
 display = None
+dashboard = None
+switch = None
+# Power state requested by the display switch, and the state last applied to the panel.
+# The switch only records its request; sync_display_power applies it from the display task,
+# so no I2C traffic happens in interrupt context.  The panel is off after the splash until a switch
+# requests it; without a switch nothing is rendered.
+display_requested = False
+display_powered = False
+display_changed = asyncio.ThreadSafeFlag()
 
 
 def toggle_display(pin):
-    try:
-        global display
-        if display:
-            if pin.value():
+    global display_requested
+    display_requested = bool(pin.value())
+    display_changed.set()
+
+
+def sync_display_power():
+    """Apply the requested power state; returns True if the display is on and worth drawing on."""
+    global display_powered
+    if not display:
+        return False
+    if display_requested != display_powered:
+        try:
+            if display_requested:
                 display.poweron()
             else:
                 display.poweroff()
-    except Exception as e:
-        print(e)
+            display_powered = display_requested
+        except Exception as e:
+            print(e)
+    return display_powered
 
 
-try:
-    if config.DISPLAY:
-        pin_scl = 1
-        pin_sda = 0
-        if config.DISPLAY_I2C_CHANNEL == 1:
-            pin_scl = 19
-            pin_sda = 18
-        scl = machine.Pin(get_gpio_for_mcu(pin_scl))
-        sda = machine.Pin(get_gpio_for_mcu(pin_sda))
-        if config.DISPLAY == "SSD1327_I2C":
+async def wait_display_change(timeout=None):
+    """Wait until the switch requests a power change, or for at most timeout seconds."""
+    if timeout is None:
+        await display_changed.wait()
+        return
+    try:
+        await asyncio.wait_for(display_changed.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+def init_display():
+    """Create the configured display and its switch, once.  Drivers are only imported when configured."""
+    global display, switch
+    if display or not settings.DISPLAY:
+        return display
+    try:
+        if settings.DISPLAY == "SSD1327_I2C":
             from growmax.displays.ssd1327 import SSD1327_I2C
-            i2c = machine.I2C(config.DISPLAY_I2C_CHANNEL, scl=scl, sda=sda, freq=100000)
-            display = SSD1327_I2C(128, 128, i2c, addr=config.DISPLAY_I2C_ADDRESS)
+            i2c = get_i2c_bus(settings.DISPLAY_I2C_CHANNEL)
+            display = SSD1327_I2C(128, 128, i2c, addr=settings.DISPLAY_I2C_ADDRESS)
 
-        if config.DISPLAY == "SH1107_I2C":
+        if settings.DISPLAY == "SH1107_I2C":
             from growmax.displays.sh1107 import SH1107_I2C
-            i2c = machine.I2C(config.DISPLAY_I2C_CHANNEL, scl=scl, sda=sda, freq=100000)
-            display = SH1107_I2C(128, 128, i2c, addr=config.DISPLAY_I2C_ADDRESS)
-        if config.DISPLAY_SWITCH:
-            pin = machine.Pin(get_gpio_for_mcu(config.DISPLAY_SWITCH), machine.Pin.IN, config.DISPLAY_SWITCH_PULL)
-            if config.DISPLAY_SWITCH_CLASS == "MotionSensor":
+            i2c = get_i2c_bus(settings.DISPLAY_I2C_CHANNEL)
+            display = SH1107_I2C(128, 128, i2c, addr=settings.DISPLAY_I2C_ADDRESS)
+        if display:
+            i2c.register_probe(display.addr, display.probe, max_freq=FAST_MODE)
+        if settings.DISPLAY_SWITCH:
+            pin = machine.Pin(get_gpio_for_mcu(settings.DISPLAY_SWITCH), machine.Pin.IN, settings.DISPLAY_SWITCH_PULL)
+            if settings.DISPLAY_SWITCH_CLASS == "MotionSensor":
+                from growmax.sensors.motion import MotionSensor
                 switch = MotionSensor(
                     pin,
-                    duration_ms=config.DISPLAY_SWITCH_DURATION_MS,
+                    duration_ms=settings.DISPLAY_SWITCH_DURATION_MS,
                     callback=toggle_display,
                 )
             else:
-                pin.irq(trigger=config.DISPLAY_SWITCH_TRIGGER, handler=toggle_display)
-except Exception as exc:
-    print(f"Exception trying to initialize display: {exc}")
+                trigger = settings.DISPLAY_SWITCH_TRIGGER or machine.Pin.IRQ_FALLING | machine.Pin.IRQ_RISING
+                pin.irq(trigger=trigger, handler=toggle_display)
+    except Exception as exc:
+        print(f"Exception trying to initialize display: {exc}")
+    return display
 
 
 def micropython_logo():
     global display
     x = (display.width - 69) // 2
     y = (display.height - 99) // 2
-    display.framebuf.fill_rect(x + 0, y + 0, 69, 69, 15)
-    display.framebuf.fill_rect(x + 15, y + 15, 3, 54, 0)
-    display.framebuf.fill_rect(x + 33, y + 0, 3, 54, 0)
-    display.framebuf.fill_rect(x + 51, y + 15, 3, 54, 0)
-    display.framebuf.fill_rect(x + 60, y + 56, 4, 7, 0)
+    display.fill_rect(x + 0, y + 0, 69, 69, 15)
+    display.fill_rect(x + 15, y + 15, 3, 54, 0)
+    display.fill_rect(x + 33, y + 0, 3, 54, 0)
+    display.fill_rect(x + 51, y + 15, 3, 54, 0)
+    display.fill_rect(x + 60, y + 56, 4, 7, 0)
     display.text("Growmax by", 20, 90)
     display.text("OpenSensor.io", 10, 110)
     display.show()
 
 
-def boot_sequence():
-    global display
+def _invalidate_dashboard():
+    # The dashboard only redraws what changed, so it starts over once another screen was drawn
+    if dashboard is not None:
+        dashboard.invalidate()
+
+
+def show_splash():
+    """Power the display on and draw the boot logo; returns True if it was shown."""
+    global display_powered
     if display:
         try:
             display.poweron()
+            display_powered = True
+            _invalidate_dashboard()
             micropython_logo()
-            time.sleep(5.0)
-            display.poweroff()
+            return True
+        except Exception as e:
+            print(e)
+    return False
+
+
+def display_dashboard(has_water, soil_moisture, dry, ppm_carbon_dioxide, temp, rh, ph_reading):
+    global display, dashboard
+    if display and display_powered:
+        try:
+            if dashboard is None:
+                from growmax.displays.dashboard import Dashboard
+                dashboard = Dashboard(display)
+            dashboard.update(has_water, soil_moisture, dry, ppm_carbon_dioxide, temp, rh, ph_reading)
         except Exception as e:
             print(e)
 
 
 def display_basic_stats(has_water, pump_position, soil_moisture, moisture_config):
     global display
-    if display:
+    if display and display_powered:
         try:
-            gc.collect()
+            _invalidate_dashboard()
             display.fill(0)
             display.text("Water ", 0, 0)
             display.text(str(has_water), 64, 0)
@@ -96,7 +152,6 @@ def display_basic_stats(has_water, pump_position, soil_moisture, moisture_config
             display.text("Config:", 0, 40)
             display.text(str(moisture_config), 64, 40)
             display.show()
-            gc.collect()
         except Exception as e:
             print(e)
 
@@ -104,14 +159,13 @@ def display_basic_stats(has_water, pump_position, soil_moisture, moisture_config
 def display_ph_reading(ph_reading):
     global display
     print(ph_reading)
-    if display:
+    if display and display_powered:
         try:
-            gc.collect()
+            _invalidate_dashboard()
             display.fill(0)
             display.text("pH ", 0, 0)
             display.text(str(ph_reading), 64, 0)
             display.show()
-            gc.collect()
         except Exception as e:
             print(e)
 
@@ -121,9 +175,9 @@ def display_scd4x_reading(temp, rh, ppm_carbon_dioxide):
     print("Temperature: %0.1f *C" % temp)
     print("Humidity: %0.1f %%" % rh)
     print("CO2: %d ppm" % ppm_carbon_dioxide)
-    if display:
+    if display and display_powered:
         try:
-            gc.collect()
+            _invalidate_dashboard()
             display.fill(0)
             display.text("temp ", 0, 0)
             display.text(str(temp), 64, 0)
@@ -132,6 +186,5 @@ def display_scd4x_reading(temp, rh, ppm_carbon_dioxide):
             display.text("CO2 ppm ", 0, 64)
             display.text(str(ppm_carbon_dioxide), 64, 64)
             display.show()
-            gc.collect()
         except Exception as e:
             print(e)
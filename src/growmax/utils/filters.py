@@ -0,0 +1,113 @@
+from array import array
+import micropython
+from micropython import const
+
+
+FILTER_MEDIAN = "median"
+FILTER_EMA = "ema"
+FILTER_TRIMMED_MEAN = "trimmed_mean"
+
+# Samples are stored as unsigned fixed point integers so filtering never allocates floats
+SCALE = const(10)
+_MAX_RAW = const(65535)
+# Extra fractional bits kept in the EMA state so truncation does not stop it short of the input
+_EMA_FRAC = const(4)
+
+
+class SampleFilter:
+    """ Fixed size ring buffers of recent samples for one or more channels.
+    All buffers are preallocated ``array('H')`` in fixed point (value * SCALE) and the
+    median, EMA and trimmed mean are computed in place, so pushing samples does not churn the heap.
+    """
+
+    def __init__(self, channels=1, size=5, mode=FILTER_MEDIAN, ema_alpha=0.3, trim=1):
+        """Create a new filter.
+        :param channels: Number of independent channels
+        :param size: Samples kept per channel
+        :param mode: One of "median", "ema" or "trimmed_mean"
+        :param ema_alpha: Weight of the newest sample for "ema" (0-1)
+        :param trim: Samples dropped from each end for "trimmed_mean"
+        """
+        if mode not in (FILTER_MEDIAN, FILTER_EMA, FILTER_TRIMMED_MEAN):
+            raise ValueError("Unknown filter mode: " + str(mode))
+        self.channels = channels
+        self.size = size
+        self.mode = mode
+        self.trim = trim
+        self._alpha_q8 = int(ema_alpha * 256)
+        self._samples = array("H", [0] * (channels * size))
+        self._scratch = array("H", [0] * size)
+        self._head = array("H", [0] * channels)
+        self._count = array("H", [0] * channels)
+        self._value = array("H", [0] * channels)
+        self._ema = array("l", [0] * channels)
+
+    def push(self, channel, sample):
+        """Add a sample for a channel and update its filtered value."""
+        raw = int(sample * SCALE + 0.5)
+        self.push_raw(channel, max(0, min(_MAX_RAW, raw)))
+
+    def push_raw(self, channel, raw):
+        """Add a fixed point sample (value * SCALE) for a channel."""
+        head = self._head[channel]
+        self._samples[channel * self.size + head] = raw
+        self._head[channel] = (head + 1) % self.size
+        count = self._count[channel]
+        if count < self.size:
+            count += 1
+            self._count[channel] = count
+
+        if self.mode == FILTER_EMA:
+            if count == 1:
+                ema = raw << _EMA_FRAC
+            else:
+                ema = self._ema[channel]
+                ema += (((raw << _EMA_FRAC) - ema) * self._alpha_q8) >> 8
+            self._ema[channel] = ema
+            self._value[channel] = (ema + (1 << (_EMA_FRAC - 1))) >> _EMA_FRAC
+        elif self.mode == FILTER_MEDIAN:
+            self._sort(channel, count)
+            if count & 1:
+                self._value[channel] = self._scratch[count >> 1]
+            else:
+                self._value[channel] = (self._scratch[(count >> 1) - 1] + self._scratch[count >> 1]) >> 1
+        else:
+            self._sort(channel, count)
+            start, end = 0, count
+            if count > 2 * self.trim:
+                start, end = self.trim, count - self.trim
+            total = 0
+            for i in range(start, end):
+                total += self._scratch[i]
+            self._value[channel] = total // (end - start)
+
+    @micropython.native
+    def _sort(self, channel, count):
+        # Insertion sort the channel's samples into the scratch buffer
+        scratch = self._scratch
+        offset = channel * self.size
+        for i in range(count):
+            sample = self._samples[offset + i]
+            j = i - 1
+            while j >= 0 and scratch[j] > sample:
+                scratch[j + 1] = scratch[j]
+                j -= 1
+            scratch[j + 1] = sample
+
+    def ready(self, channel):
+        """Return True once the channel has at least one sample."""
+        return self._count[channel] > 0
+
+    def raw_value(self, channel):
+        """Return the filtered value of a channel in fixed point (value * SCALE)."""
+        return self._value[channel]
+
+    def value(self, channel):
+        """Return the filtered value of a channel."""
+        return self._value[channel] / SCALE
+
+    def reset(self, channel):
+        self._head[channel] = 0
+        self._count[channel] = 0
+        self._value[channel] = 0
+        self._ema[channel] = 0
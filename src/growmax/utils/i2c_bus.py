@@ -0,0 +1,211 @@
+import json
+import machine
+import utime
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from growmax.utils.configs import settings
+from growmax.utils.mcu import i2c_channel_pins
+
+
+DEFAULT_I2C_FREQ = 100000
+# Rated clock rates passed to register_probe as a device's max_freq
+STANDARD_MODE = 100000
+FAST_MODE = 400000
+# Clock rates tried by calibrate_bus, fastest first
+CALIBRATION_FREQS = (1000000, 800000, 400000, 200000, 100000)
+# Fraction of the fastest stable clock rate that is actually used
+CALIBRATION_MARGIN = 0.8
+CALIBRATION_ROUNDS = 5
+# Calibrated clock rates are stored on flash so later boots skip calibration
+TUNING_FILE = "i2c_tuning.json"
+
+# Shared buses keyed by QWIIC channel (0 or 1)
+_buses = {}
+
+
+class SharedI2C:
+    """ A ``machine.I2C`` shared by every driver on one QWIIC channel.
+    Exposes the subset of the ``machine.I2C`` API used by the drivers.  Needs no lock: the drivers
+    run in one uasyncio loop and never await between a command and its response, so their transfers
+    cannot interleave.  A driver that ever does must not share the bus during that gap.
+    """
+
+    def __init__(self, channel=0, freq=DEFAULT_I2C_FREQ):
+        self.channel = channel
+        self.freq = freq
+        self.devices = ()
+        self._probes = {}
+        self._max_freqs = {}
+        self._i2c = None
+        self.set_freq(freq)
+
+    def set_freq(self, freq):
+        """Re-initialize the bus at a new clock rate."""
+        pin_scl, pin_sda = i2c_channel_pins(self.channel)
+        self._i2c = machine.I2C(self.channel, scl=machine.Pin(pin_scl), sda=machine.Pin(pin_sda), freq=freq)
+        self.freq = freq
+
+    def register_probe(self, addr, probe, max_freq=None):
+        """Register a cheap check for the device at addr, used to verify clock rates during calibration.
+        probe() must raise (ex: OSError on a missing ACK, RuntimeError on a CRC mismatch) when the
+        transfer was not correct.
+        max_freq is the device's rated clock rate: the bus never runs faster, even when it ACKs faster.
+        """
+        self._probes[addr] = probe
+        if max_freq:
+            self._max_freqs[addr] = max_freq
+            if self.freq > max_freq:
+                # Ex: a rate stored by an older calibration
+                self.set_freq(max_freq)
+
+    @property
+    def max_freq(self):
+        """The lowest rated clock rate of the registered devices, or None if none was given."""
+        return min(self._max_freqs.values()) if self._max_freqs else None
+
+    def verify(self, rounds=CALIBRATION_ROUNDS):
+        """Return True if every discovered device ACKs a scan and passes its probe for all rounds."""
+        for _ in range(rounds):
+            found = self._i2c.scan()
+            for addr in self.devices:
+                if addr not in found:
+                    return False
+            for addr in self._probes:
+                try:
+                    self._probes[addr]()
+                except Exception:
+                    return False
+        return True
+
+    def scan(self):
+        """Scan the bus and cache the addresses that acknowledged."""
+        self.devices = tuple(self._i2c.scan())
+        return self.devices
+
+    def has_device(self, addr):
+        """Return True if addr answered the last scan."""
+        return addr in self.devices
+
+    def require_ack(self, addr):
+        """Scan the bus again, raising OSError unless addr answers."""
+        if addr not in self.scan():
+            raise OSError("No ACK from I2C address " + hex(addr))
+
+    def writeto(self, addr, buf, stop=True):
+        return self._i2c.writeto(addr, buf, stop)
+
+    def writevto(self, addr, vector, stop=True):
+        return self._i2c.writevto(addr, vector, stop)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        return self._i2c.readfrom(addr, nbytes, stop)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        return self._i2c.readfrom_into(addr, buf, stop)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        return self._i2c.readfrom_mem(addr, memaddr, nbytes, addrsize=addrsize)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        return self._i2c.writeto_mem(addr, memaddr, buf, addrsize=addrsize)
+
+
+def _load_tuning():
+    try:
+        with open(TUNING_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_tuning():
+    tuning = _load_tuning()
+    for channel in _buses:
+        tuning[str(channel)] = _buses[channel].freq
+    try:
+        with open(TUNING_FILE, "w") as f:
+            json.dump(tuning, f)
+    except OSError as e:
+        print("Unable to store I2C tuning:", e)
+
+
+def get_i2c_bus(channel=0):
+    """Return the shared bus for a QWIIC channel, creating and scanning it on first use.
+    With ``I2C_AUTO_TUNE`` the bus runs at its calibrated clock rate when one is stored; otherwise,
+    and whenever auto-tuning is off, it runs at ``I2C_FREQ``.
+    """
+    bus = _buses.get(channel)
+    if bus is None:
+        freq = None
+        if settings.I2C_AUTO_TUNE:
+            freq = _load_tuning().get(str(channel))
+        freq = freq or settings.I2C_FREQ
+        bus = SharedI2C(channel, freq)
+        bus.scan()
+        print("I2C channel", channel, "devices:", [hex(addr) for addr in bus.devices])
+        _buses[channel] = bus
+    return bus
+
+
+def device_present(channel, addr):
+    """Return True if addr was discovered on the channel's bus."""
+    return get_i2c_bus(channel).has_device(addr)
+
+
+async def wait_ready(probe, timeout_ms=2000, interval_ms=50):
+    """Call probe until it stops raising and return its result, re-raising its error after timeout_ms.
+    Used instead of fixed delays while devices power up.
+    """
+    deadline = utime.ticks_add(utime.ticks_ms(), timeout_ms)
+    while True:
+        try:
+            return probe()
+        except Exception:
+            if utime.ticks_diff(deadline, utime.ticks_ms()) <= 0:
+                raise
+        await asyncio.sleep(interval_ms / 1000)
+
+
+def calibrate_bus(channel, freqs=CALIBRATION_FREQS, margin=CALIBRATION_MARGIN):
+    """Find the fastest clock rate at which every device on the channel passes its probes.
+    The bus is left running at that rate times margin (never below the slowest candidate), capped at
+    the slowest registered device's rated clock rate.
+    Returns the chosen clock rate.
+    """
+    bus = get_i2c_bus(channel)
+    cap = bus.max_freq
+    slowest = min(freqs)
+    if cap:
+        slowest = min(slowest, cap)
+    chosen = slowest
+    for freq in sorted(freqs, reverse=True):
+        if cap and freq > cap:
+            continue
+        bus.set_freq(freq)
+        if bus.verify():
+            chosen = max(slowest, int(freq * margin))
+            if freq == cap:
+                # Rated rates need no margin
+                chosen = cap
+            break
+    bus.set_freq(chosen)
+    print("I2C channel", channel, "calibrated to", chosen, "Hz")
+    return chosen
+
+
+def calibrate_all(force=False):
+    """Calibrate every bus in use that has no stored clock rate (or all of them when force is set),
+    and store the results on flash.
+    """
+    tuning = _load_tuning()
+    calibrated = False
+    for channel in _buses:
+        if force or str(channel) not in tuning:
+            calibrate_bus(channel)
+            calibrated = True
+    if calibrated:
+        _save_tuning()
@@ -0,0 +1,106 @@
+from array import array
+from micropython import const
+import utime
+
+
+PHASE_WIFI = const(0)
+PHASE_MOISTURE = const(1)
+PHASE_WATER = const(2)
+PHASE_DOSING = const(3)
+PHASE_REFILL = const(4)
+PHASE_PH = const(5)
+PHASE_SCD4X = const(6)
+PHASE_REPORT = const(7)
+PHASE_DISPLAY = const(8)
+
+PHASE_NAMES = ("wifi", "moisture", "water", "dosing", "refill", "ph", "scd4x", "report", "display")
+
+DEFAULT_SAMPLES = const(32)
+
+
+class PhaseProfiler:
+    """ Track how long each phase of the routine takes using ``utime.ticks_us``.
+    Durations are kept in fixed size arrays so profiling does not churn the heap.
+    Usage::
+        start = profiler.start()
+        ...
+        profiler.stop(PHASE_MOISTURE, start)
+    """
+
+    def __init__(self, enabled=True, samples=DEFAULT_SAMPLES, phase_names=PHASE_NAMES):
+        self.enabled = enabled
+        self.phase_names = phase_names
+        self.samples = samples
+        num_phases = len(phase_names)
+        # Ring buffer of the most recent durations (us) for each phase, stored back to back
+        self._durations = array("L", [0] * (num_phases * samples))
+        self._scratch = array("L", [0] * samples)
+        self._count = array("L", [0] * num_phases)
+        self._min = array("L", [0xFFFFFFFF] * num_phases)
+        self._max = array("L", [0] * num_phases)
+
+    def start(self):
+        if not self.enabled:
+            return 0
+        return utime.ticks_us()
+
+    def stop(self, phase, start):
+        if self.enabled:
+            self.record(phase, utime.ticks_diff(utime.ticks_us(), start))
+
+    def record(self, phase, elapsed_us):
+        count = self._count[phase]
+        self._durations[phase * self.samples + count % self.samples] = elapsed_us
+        self._count[phase] = count + 1
+        if elapsed_us < self._min[phase]:
+            self._min[phase] = elapsed_us
+        if elapsed_us > self._max[phase]:
+            self._max[phase] = elapsed_us
+
+    def reset(self):
+        for phase in range(len(self.phase_names)):
+            self._count[phase] = 0
+            self._min[phase] = 0xFFFFFFFF
+            self._max[phase] = 0
+
+    def _percentile(self, phase, num, percent):
+        # Insertion sort the recent samples into the scratch buffer
+        scratch = self._scratch
+        offset = phase * self.samples
+        for i in range(num):
+            value = self._durations[offset + i]
+            j = i - 1
+            while j >= 0 and scratch[j] > value:
+                scratch[j + 1] = scratch[j]
+                j -= 1
+            scratch[j + 1] = value
+        return scratch[(num - 1) * percent // 100]
+
+    def phase_summary(self, phase):
+        """Return min/mean/max/p95 in microseconds for a phase, or None if it has no samples.
+        The mean and p95 cover the most recent samples; min and max cover the whole run.
+        """
+        count = self._count[phase]
+        if not count:
+            return None
+        num = min(count, self.samples)
+        offset = phase * self.samples
+        total = 0
+        for i in range(num):
+            total += self._durations[offset + i]
+        return {
+            "n": count,
+            "min": self._min[phase],
+            "mean": total // num,
+            "max": self._max[phase],
+            "p95": self._percentile(phase, num, 95),
+        }
+
+    def summary(self):
+        """Return a dict of phase name to phase summary for every phase with samples."""
+        result = {}
+        for phase, name in enumerate(self.phase_names):
+            phase_summary = self.phase_summary(phase)
+            if phase_summary:
+                result[name] = phase_summary
+        return result
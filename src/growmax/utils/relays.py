@@ -1,30 +1,21 @@
-import machine
-import time
-
-import config
-from growmax.utils.configs import get_config_value
-from growmax.utils.mcu import i2c_channel_pins
-from growmax.relays.i2c_relays import RelayBoard
+from growmax.utils.configs import settings
+from growmax.utils.i2c_bus import STANDARD_MODE, get_i2c_bus
 
 
 def initialize_relay_board():
-    if get_config_value("RELAY_BOARD_ENABLED"):
-        i2c_channel = config.RELAY_BOARD_I2C_CHANNEL
-        pin_scl, pin_sda = i2c_channel_pins(i2c_channel)
+    if settings.RELAY_BOARD_ENABLED:
         try:
-            time.sleep(2.0)
-            i2c = machine.I2C(
-                i2c_channel,
-                scl=machine.Pin(pin_scl),
-                sda=machine.Pin(pin_sda),
-                freq=100000
-            )
-            time.sleep(2.0)
+            from growmax.relays.i2c_relays import RelayBoard
+            i2c = get_i2c_bus(settings.RELAY_BOARD_I2C_CHANNEL)
+            if not i2c.has_device(settings.RELAY_BOARD_I2C_ADDRESS):
+                print("Relay board not found at address", hex(settings.RELAY_BOARD_I2C_ADDRESS))
             relay_board = RelayBoard(
                 i2c,
-                addr=config.RELAY_BOARD_I2C_ADDRESS,
-                num_relays=config.RELAY_BOARD_NUM_RELAYS
+                addr=settings.RELAY_BOARD_I2C_ADDRESS,
+                num_relays=settings.RELAY_BOARD_NUM_RELAYS
             )
+            # The PCF8574 is only rated for 100 kHz
+            i2c.register_probe(settings.RELAY_BOARD_I2C_ADDRESS, relay_board.probe, max_freq=STANDARD_MODE)
             return relay_board
         except Exception as e:
             print(e)
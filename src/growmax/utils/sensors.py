@@ -1,39 +1,63 @@
-import machine
-import time
-from growmax.sensors import adafruit_scd4x
-from growmax.utils.mcu import i2c_channel_pins
+from growmax.utils.configs import settings
+from growmax.utils.i2c_bus import FAST_MODE, get_i2c_bus, wait_ready
 
 
-def init_adafruit_scd4x(i2c_channel=0):
-    pin_scl, pin_sda = i2c_channel_pins(i2c_channel)
+# The SCD4x needs up to 1 s after power-up before it answers commands
+SCD4X_READY_TIMEOUT_MS = 2000
+
+SCD4X_MODE_PERIODIC = "periodic"
+SCD4X_MODE_LOW_POWER = "low_power"
+SCD4X_MODE_SINGLE_SHOT = "single_shot"
+
+
+def scd4x_mode_for_interval(interval):
+    """Pick the SCD4x measurement mode for readings consumed every interval seconds."""
+    if interval < 30:
+        return SCD4X_MODE_PERIODIC  # A sample every 5 s
+    if interval < 120:
+        return SCD4X_MODE_LOW_POWER  # A sample every 30 s
+    return SCD4X_MODE_SINGLE_SHOT  # One sample per read, started ~5 s before it
+
+
+async def init_adafruit_scd4x(i2c_channel=0, interval=60):
+    """Initialize the SCD4x as soon as it answers, polling instead of sleeping a fixed time."""
+    from growmax.sensors import adafruit_scd4x
     try:
-        time.sleep(2.0)
-        i2c = machine.I2C(
-            i2c_channel,
-            scl=machine.Pin(pin_scl),
-            sda=machine.Pin(pin_sda),
-            freq=100000
-        )
-        time.sleep(2.0)
+        i2c = get_i2c_bus(i2c_channel)
+        address = adafruit_scd4x.SCD4X_DEFAULT_ADDR
+        await wait_ready(lambda: i2c.require_ack(address), SCD4X_READY_TIMEOUT_MS)
         scd4x = adafruit_scd4x.SCD4X(i2c)
-        time.sleep(2.0)
-        print("Serial number:", [hex(i) for i in scd4x.serial_number])
-        time.sleep(1.0)
-        scd4x.start_periodic_measurement()
-        print("Waiting for first measurement....")
-        time.sleep(1.0)
+        serial_number = await wait_ready(lambda: scd4x.serial_number, SCD4X_READY_TIMEOUT_MS)
+        print("Serial number:", [hex(i) for i in serial_number])
+        mode = settings.ADAFRUIT_SCD4X_MODE or scd4x_mode_for_interval(interval)
+        print("SCD4x measurement mode:", mode)
+        if mode == SCD4X_MODE_SINGLE_SHOT:
+            try:
+                # Samples are requested by request_adafruit_scd4x_sample; probe support now (SCD41 only)
+                scd4x.measure_single_shot()
+            except RuntimeError:
+                print("Single shot measurements not supported, using low power mode")
+                mode = SCD4X_MODE_LOW_POWER
+        if mode == SCD4X_MODE_LOW_POWER:
+            scd4x.start_low_periodic_measurement()
+        elif mode != SCD4X_MODE_SINGLE_SHOT:
+            scd4x.start_periodic_measurement()
+        # data_ready is CRC checked, so it doubles as the calibration probe
+        i2c.register_probe(scd4x.i2c_address, lambda: scd4x.data_ready, max_freq=FAST_MODE)
         return scd4x
     except Exception as e:
         print(e)
     return None
 
 
+def request_adafruit_scd4x_sample(scd4x):
+    """In single shot mode, start the measurement the next read_adafruit_scd4x collects."""
+    if scd4x.single_shot and not scd4x.ms_until_sample():
+        scd4x.measure_single_shot()
+
+
 def read_adafruit_scd4x(scd4x):
-    time.sleep(2.0)
-    if scd4x.data_ready:
-        ppm_carbon_dioxide = scd4x.CO2
-        temp = scd4x.temperature
-        rh = scd4x.relative_humidity
-        return [temp, rh, ppm_carbon_dioxide]
-    print("SCD-40 data not available")
-    return [None, None, None]
+    ppm_carbon_dioxide, temp, rh = scd4x.read_measurement()
+    if ppm_carbon_dioxide is None:
+        print("SCD-40 data not available")
+    return [temp, rh, ppm_carbon_dioxide]
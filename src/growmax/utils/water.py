@@ -1,6 +1,12 @@
 import utime
 
+
 def statistically_has_water(water_sensor):
+    """Deprecated: use ``growmax.sensors.water_level.WaterLevelSensor``, which debounces the level in the
+    background.  Given a WaterLevelSensor this returns its ``has_water``; a Pin is still sampled 3 times.
+    """
+    if hasattr(water_sensor, "has_water"):
+        return water_sensor.has_water
     for x in range(0, 3):
         water_in_bucket = not water_sensor.value()
         if not water_in_bucket:
@@ -1,35 +1,50 @@
-import time
-import config
+import utime
+from growmax.utils.configs import settings
 
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+
+# Seconds to wait for a connection before giving up until the next check
+CONNECT_TIMEOUT = 20
 
 # Global variables
 wlan = None
 
-def ensure_wifi_connected():
+async def ensure_wifi_connected(timeout=CONNECT_TIMEOUT):
+    """Connect to Wi-Fi if needed, polling without blocking the other tasks.
+    Returns True once connected, False if Wi-Fi is disabled or the connection timed out.
+    """
     # check if the Wi-Fi interface is connected
-    if not config.WIFI_ENABLED:
+    if not settings.WIFI_ENABLED:
         print("WIFI not enabled; change your config if you want wifi capabilities enabled.")
-        return
+        return False
     print("ensure_wifi_connected")
-    time.sleep(1.0)
     import network
     global wlan
     if wlan is None:
         wlan = network.WLAN(network.STA_IF)
         wlan.active(True)
         wlan.disconnect()
-        time.sleep(1.0)
-    if not wlan.isconnected():
-        print(f"Connecting to Wi-Fi SSID: {config.WIFI_SSID}")
-        wlan.connect(config.WIFI_SSID, config.WIFI_PASSWORD)
-
-        # connect to the Wi-Fi network:
-        while not wlan.isconnected():
-            time.sleep(0.5)
+        await asyncio.sleep(1.0)
+    if wlan.isconnected():
+        return True
+    print(f"Connecting to Wi-Fi SSID: {settings.WIFI_SSID}")
+    wlan.connect(settings.WIFI_SSID, settings.WIFI_PASSWORD)
 
-        # sync current time via NTP
-        from growmax import ntpclient
-        ntpclient.settime()
-        print(f"Connected to Wi-Fi SSID: {config.WIFI_SSID}")
-        time.sleep(0.5)
+    # wait for the connection, giving up after timeout so a Wi-Fi outage is retried on the next check
+    deadline = utime.ticks_add(utime.ticks_ms(), int(timeout * 1000))
+    while not wlan.isconnected():
+        if utime.ticks_diff(deadline, utime.ticks_ms()) <= 0:
+            print(f"Timed out connecting to Wi-Fi SSID: {settings.WIFI_SSID}")
+            wlan.disconnect()
+            return False
+        await asyncio.sleep(0.5)
 
+    # sync current time via NTP
+    from growmax import ntpclient
+    ntpclient.settime()
+    print(f"Connected to Wi-Fi SSID: {settings.WIFI_SSID}")
+    return True
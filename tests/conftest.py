@@ -0,0 +1,83 @@
+"""Host (CPython) shims for the MicroPython modules growmax imports, so its logic can be tested with pytest."""
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+def _install_utime():
+    utime = types.ModuleType("utime")
+    # Manually advanced clock, in microseconds
+    utime.now_us = 0
+
+    def advance_ms(ms):
+        utime.now_us += int(ms * 1000)
+
+    utime.advance_ms = advance_ms
+    utime.ticks_us = lambda: utime.now_us
+    utime.ticks_ms = lambda: utime.now_us // 1000
+    utime.ticks_add = lambda ticks, delta: ticks + delta
+    utime.ticks_diff = lambda end, start: end - start
+    sys.modules["utime"] = utime
+
+
+def _install_micropython():
+    micropython = types.ModuleType("micropython")
+    micropython.const = lambda value: value
+    micropython.native = lambda function: function
+    micropython.viper = lambda function: function
+    sys.modules["micropython"] = micropython
+
+
+def _install_machine():
+    machine = types.ModuleType("machine")
+
+    class Pin:
+        IN = 0
+        OUT = 1
+        PULL_UP = 1
+        PULL_DOWN = 2
+        IRQ_FALLING = 4
+        IRQ_RISING = 8
+
+        def __init__(self, pin, *args, **kwargs):
+            self.pin = pin
+
+    class PWM:
+        def __init__(self, pin):
+            self.pin = pin
+            self.duty = 0
+
+        def freq(self, freq):
+            pass
+
+        def duty_u16(self, duty):
+            self.duty = duty
+
+    class Timer:
+        ONE_SHOT = 0
+        PERIODIC = 1
+
+        def __init__(self, timer_id=-1):
+            # Like ESP32: no virtual timers, so drivers fall back to their polled deadlines
+            raise ValueError("no virtual timers")
+
+    machine.Pin = Pin
+    machine.PWM = PWM
+    machine.Timer = Timer
+    sys.modules["machine"] = machine
+
+
+def _install_config():
+    # Stand-in for the user's config.py, which lives on the board's filesystem
+    config = types.ModuleType("config")
+    config.GROWMAX_MCU = "RP2040"
+    config.SOIL_WET_THRESHOLD = 10
+    sys.modules["config"] = config
+
+
+_install_utime()
+_install_micropython()
+_install_machine()
+_install_config()
@@ -0,0 +1,93 @@
+import json
+import os
+
+import pytest
+
+from growmax.utils import configs
+from growmax.utils.configs import OVERRIDES_FILE, settings
+
+
+@pytest.fixture(autouse=True)
+def overrides_dir(tmp_path, monkeypatch):
+    """Keep config.json in a temporary directory and restore the config.py settings afterwards."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(configs, "_stamp", None)
+    yield tmp_path
+    if os.path.exists(OVERRIDES_FILE):
+        os.remove(OVERRIDES_FILE)
+    assert configs.reload_settings()
+
+
+def write_overrides(overrides):
+    with open(OVERRIDES_FILE, "w") as f:
+        json.dump(overrides, f)
+
+
+def test_invalid_settings_are_all_listed():
+    with pytest.raises(ValueError) as e:
+        configs._build({"PUMP_CYCLE_DURATION": -1, "WIFI_ENABLED": "yes", "PUMP_CYCLE_DURATON": 5})
+    message = str(e.value)
+    assert "PUMP_CYCLE_DURATION" in message
+    assert "WIFI_ENABLED" in message
+    assert "PUMP_CYCLE_DURATON: unknown setting" in message
+
+
+def test_threshold_expands_to_every_channel():
+    assert settings.MOISTURE_THRESHOLDS == (10,) * 8
+    assert configs.reload_settings({"SOIL_WET_THRESHOLD": [1, 2, 3, 4, 5, 6, 7, 8]})
+    assert settings.MOISTURE_THRESHOLDS == (1, 2, 3, 4, 5, 6, 7, 8)
+    assert configs.get_moisture_threshold_for_position(2) == 3
+
+
+def test_invalid_change_is_not_applied():
+    assert not configs.reload_settings({"SOIL_WET_THRESHOLD": [1, 2]})
+    assert not configs.reload_settings({"PUMP_SOAK_TIME": 5, "REPORT_INTERVAL": 0})
+    assert settings.PUMP_SOAK_TIME == 60
+    assert settings.MOISTURE_THRESHOLDS == (10,) * 8
+
+
+def test_restart_settings_are_not_reloaded():
+    assert not configs.reload_settings({"I2C_FREQ": 400000, "PUMP_SOAK_TIME": 5})
+    assert settings.I2C_FREQ == 100000
+    assert settings.PUMP_SOAK_TIME == 60
+
+
+def test_persisted_changes_are_stored():
+    assert configs.reload_settings({"PUMP_SOAK_TIME": 5}, persist=True)
+    assert settings.PUMP_SOAK_TIME == 5
+    with open(OVERRIDES_FILE) as f:
+        assert json.load(f) == {"PUMP_SOAK_TIME": 5}
+    assert not os.path.exists(OVERRIDES_FILE + ".tmp")
+
+
+def test_remote_command_allowlist():
+    assert configs.apply_config_command("PUMP_CYCLE_DURATION", "12.5")
+    assert settings.PUMP_CYCLE_DURATION == 12.5
+    assert not configs.apply_config_command("WIFI_PASSWORD", "secret")
+    assert not configs.apply_config_command("PUMP_WHEN_DRY", "true")
+    assert not settings.PUMP_WHEN_DRY
+    with open(OVERRIDES_FILE) as f:
+        assert json.load(f) == {"PUMP_CYCLE_DURATION": 12.5}
+
+
+def test_reload_if_changed_follows_config_json():
+    assert not configs.reload_if_changed()
+    write_overrides({"REPORT_INTERVAL": 15})
+    assert configs.reload_if_changed()
+    assert settings.REPORT_INTERVAL == 15
+    assert not configs.reload_if_changed()
+    os.remove(OVERRIDES_FILE)
+    assert configs.reload_if_changed()
+    assert settings.REPORT_INTERVAL == 60
+
+
+def test_own_writes_do_not_trigger_reload():
+    assert configs.reload_settings({"REPORT_INTERVAL": 15}, persist=True)
+    assert not configs.reload_if_changed()
+
+
+def test_invalid_config_json_is_ignored():
+    with open(OVERRIDES_FILE, "w") as f:
+        f.write("{not json")
+    assert configs.reload_settings()
+    assert settings.REPORT_INTERVAL == 60
@@ -0,0 +1,86 @@
+import utime
+import pytest
+
+from growmax.counters import BACKEND_SIMULATED, create_counter_array
+from growmax.counters.simulated import SimulatedCounterArray
+from growmax.moisture import MoistureArray
+from growmax.utils.filters import FILTER_EMA, FILTER_MEDIAN
+
+WINDOW_MS = 1000
+
+
+def make_array(channels=8, **kwargs):
+    counters = SimulatedCounterArray(channels)
+    return MoistureArray(channels, window_ms=WINDOW_MS, counters=counters, **kwargs), counters
+
+
+def window(moisture, counters, pulses):
+    """Feed one counting window with pulses[position] edges per channel."""
+    for position, edges in enumerate(pulses):
+        counters.pulse(position, edges)
+    utime.advance_ms(WINDOW_MS)
+    assert moisture.update()
+
+
+def test_readings_are_pulses_per_second():
+    moisture, counters = make_array(channels=4)
+    window(moisture, counters, [10, 0, 27, 3])
+    assert list(moisture.read_into([0.0] * 4)) == pytest.approx([10.0, 0.0, 27.0, 3.0])
+
+
+def test_no_new_reading_before_window_elapses():
+    moisture, counters = make_array(channels=1)
+    window(moisture, counters, [12])
+    counters.pulse(0, 99)
+    utime.advance_ms(WINDOW_MS // 2)
+    assert not moisture.update()
+    assert moisture.moisture(0) == pytest.approx(12.0)
+
+
+def test_partial_window_scales_reading():
+    moisture, counters = make_array(channels=1)
+    counters.pulse(0, 30)
+    utime.advance_ms(2 * WINDOW_MS)
+    assert moisture.update()
+    assert moisture.moisture(0) == pytest.approx(15.0)
+
+
+def test_median_filter_rejects_spike():
+    moisture, counters = make_array(channels=2, filter_mode=FILTER_MEDIAN, filter_size=3)
+    for pulses in ([10, 20], [100, 21], [12, 19]):
+        window(moisture, counters, pulses)
+    assert moisture.moisture(0) == pytest.approx(12.0)
+    assert moisture.filtered(0) == pytest.approx(12.0)
+    assert moisture.filtered(1) == pytest.approx(20.0)
+
+
+def test_ema_filter_settles_on_input():
+    moisture, counters = make_array(channels=1, filter_mode=FILTER_EMA, filter_size=5)
+    for edges in range(0, 21):
+        window(moisture, counters, [edges])
+    for _ in range(30):
+        window(moisture, counters, [20])
+    assert moisture.filtered(0) == pytest.approx(20.0)
+
+
+@pytest.mark.parametrize("edges, expected", [(27, 0.0), (1, 1.0), (14, 0.5), (40, 0.0), (0, 1.0)])
+def test_saturation_from_wet_and_dry_points(edges, expected):
+    moisture, counters = make_array(channels=1, wet_point=1, dry_point=27)
+    window(moisture, counters, [edges])
+    assert moisture.saturation_into([0.0])[0] == pytest.approx(expected)
+
+
+def test_channel_inactive_without_pulses():
+    moisture, counters = make_array(channels=2)
+    window(moisture, counters, [5, 0])
+    window(moisture, counters, [5, 0])
+    assert moisture.active(0)
+    assert not moisture.active(1)
+
+
+def test_simulated_backend_counter_array():
+    counters = create_counter_array([10, 11, 12], BACKEND_SIMULATED)
+    assert isinstance(counters, SimulatedCounterArray)
+    counters.pulse(1, 4)
+    assert counters.take_into([0, 0, 0]) == [0, 4, 0]
+    assert counters.take_into([0, 0, 0]) == [0, 0, 0]
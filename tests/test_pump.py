@@ -0,0 +1,92 @@
+import utime
+
+from growmax.pump import Pump, PumpScheduler
+
+
+def make_scheduler(pumps=3, budget_ma=200, pump_ma=200):
+    return PumpScheduler([Pump(channel) for channel in range(1, pumps + 1)], budget_ma, pump_ma)
+
+
+def running(scheduler):
+    return [position for position, pump in enumerate(scheduler.pumps) if pump.dosing]
+
+
+def test_non_blocking_dose_stops_at_deadline():
+    pump = Pump(1)
+    assert pump.dose(0.5, 2, blocking=False)
+    assert pump.get_speed() == 0.5
+    utime.advance_ms(1999)
+    assert pump.service()
+    utime.advance_ms(1)
+    assert not pump.service()
+    assert pump.get_speed() == 0
+
+
+def test_dose_is_not_replaced_unless_forced():
+    pump = Pump(1)
+    assert pump.dose(1, 1, blocking=False)
+    assert not pump.dose(0.5, 1, blocking=False)
+    assert pump.get_speed() == 1
+    assert pump.dose(0.5, 1, blocking=False, force=True)
+    assert pump.get_speed() == 0.5
+
+
+def test_budget_limits_concurrent_doses():
+    scheduler = make_scheduler(budget_ma=400, pump_ma=200)
+    for position in range(3):
+        scheduler.request(position, 1)
+    scheduler.service()
+    assert scheduler.active_count == 2
+    assert scheduler.busy(2)
+
+
+def test_driest_channel_starts_first():
+    scheduler = make_scheduler()
+    scheduler.request(0, 1, priority=1)
+    scheduler.request(1, 2, priority=5)
+    scheduler.request(2, 1, priority=3)
+    scheduler.service()
+    assert running(scheduler) == [1]
+    utime.advance_ms(2000)
+    scheduler.service()
+    assert running(scheduler) == [2]
+    assert scheduler.last_dose_ms[1] == utime.ticks_ms()
+    utime.advance_ms(1000)
+    scheduler.service()
+    assert running(scheduler) == [0]
+
+
+def test_request_updates_queued_dose_and_rejects_running_one():
+    scheduler = make_scheduler()
+    assert scheduler.request(0, 1, priority=1)
+    assert scheduler.request(1, 1, priority=2)
+    assert scheduler.request(0, 3, priority=9)
+    scheduler.service()
+    assert running(scheduler) == [0]
+    assert not scheduler.request(0, 1)
+    utime.advance_ms(2999)
+    scheduler.service()
+    assert running(scheduler) == [0]
+
+
+def test_stop_all_drops_queue():
+    scheduler = make_scheduler()
+    scheduler.request(0, 5)
+    scheduler.request(1, 5)
+    scheduler.service()
+    scheduler.stop_all()
+    assert running(scheduler) == []
+    assert scheduler.active_count == 0
+    assert not scheduler.busy(1)
+
+
+def test_halt_all_is_reaped_by_service():
+    scheduler = make_scheduler(budget_ma=600)
+    scheduler.request(0, 5)
+    scheduler.request(2, 5)
+    scheduler.service()
+    scheduler.halt_all()
+    assert running(scheduler) == []
+    scheduler.service()
+    assert scheduler.active_count == 0
+    assert scheduler.last_dose_ms[0] == utime.ticks_ms()
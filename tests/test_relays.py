@@ -0,0 +1,148 @@
+import utime
+
+from growmax.relays.i2c_relays import RETRY_BACKOFF_MS, WRITE_ATTEMPTS, RelayBoard
+
+ADDR = 0x27
+
+
+class FakeI2C:
+    """PCF8574 stand-in: the port reads back what was last written, unless writes fail or stick."""
+
+    def __init__(self):
+        self.port = 0xFF
+        self.writes = []
+        self.fail = 0
+        self.stuck = False
+
+    def writeto(self, addr, buf):
+        assert addr == ADDR
+        if self.fail:
+            self.fail -= 1
+            raise OSError(5)
+        self.writes.append(buf[0])
+        if not self.stuck:
+            self.port = buf[0]
+
+    def readfrom(self, addr, nbytes):
+        return bytes([self.port])
+
+
+def make_board():
+    i2c = FakeI2C()
+    return RelayBoard(i2c, addr=ADDR), i2c
+
+
+def test_relays_are_active_low_with_relay_1_as_msb():
+    board, i2c = make_board()
+    board.turn_on(1)
+    board.turn_on(3)
+    assert board.state == [1, 0, 1, 0, 0, 0, 0, 0]
+    assert i2c.port == 0x5F
+    assert board.confirmed
+    board.turn_off(1)
+    assert i2c.port == 0xDF
+    assert board.is_confirmed_off(1)
+
+
+def test_set_many_and_transaction_write_once():
+    board, i2c = make_board()
+    board.set_many(on=(1, 2, 3))
+    assert len(i2c.writes) == 1
+    with board.transaction():
+        board.turn_off(1)
+        board.turn_on(4)
+    assert len(i2c.writes) == 2
+    assert board.state[:4] == [0, 1, 1, 1]
+
+
+def test_unchanged_state_is_not_rewritten():
+    board, i2c = make_board()
+    board.turn_on(2)
+    board.turn_on(2)
+    board.service()
+    assert len(i2c.writes) == 1
+
+
+def test_all_off_keeps_positions():
+    board, i2c = make_board()
+    board.set_many(on=(1, 2, 5))
+    board.all_off(keep=(2, None))
+    assert board.state == [0, 1, 0, 0, 0, 0, 0, 0]
+    assert len(i2c.writes) == 2
+
+
+def test_pulse_switches_off_after_duration():
+    board, i2c = make_board()
+    board.pulse(2, 1.5)
+    assert board.is_on(2)
+    utime.advance_ms(1000)
+    board.service()
+    assert board.is_on(2)
+    assert board.remaining_ms(2) == 500
+    utime.advance_ms(500)
+    board.service()
+    assert not board.is_on(2)
+    assert not board.scheduled(2)
+    assert board.is_confirmed_off(2)
+
+
+def test_schedule_with_delay_and_cancel():
+    board, i2c = make_board()
+    board.schedule(3, 2, delay=1)
+    assert not board.is_on(3)
+    assert board.scheduled(3)
+    utime.advance_ms(1000)
+    board.service()
+    assert board.is_on(3)
+    board.cancel(3)
+    assert not board.is_on(3)
+    assert not board.scheduled(3)
+
+
+def test_failed_switch_off_is_retried_on_next_service():
+    board, i2c = make_board()
+    board.turn_on(1)
+    i2c.fail = WRITE_ATTEMPTS
+    board.turn_off(1)
+    assert not board.confirmed
+    assert not board.is_confirmed_off(1)
+    # Closing is never delayed by the backoff
+    board.service()
+    assert board.confirmed
+    assert board.is_confirmed_off(1)
+    assert i2c.port == 0xFF
+
+
+def test_failed_switch_on_backs_off():
+    board, i2c = make_board()
+    i2c.fail = WRITE_ATTEMPTS
+    board.turn_on(1)
+    assert not board.confirmed
+    board.service()
+    assert i2c.writes == []
+    utime.advance_ms(RETRY_BACKOFF_MS)
+    board.service()
+    assert board.confirmed
+    assert i2c.port == 0x7F
+
+
+def test_switch_off_during_backoff_is_written_at_once():
+    board, i2c = make_board()
+    i2c.fail = WRITE_ATTEMPTS
+    board.turn_on(1)
+    # The failed write may have switched relay 1 on, so turning it off must not wait
+    board.turn_off(1)
+    assert board.confirmed
+    assert board.is_confirmed_off(1)
+
+
+def test_readback_mismatch_is_not_confirmed():
+    board, i2c = make_board()
+    i2c.stuck = True
+    board.turn_on(1)
+    assert not board.confirmed
+    assert len(i2c.writes) == WRITE_ATTEMPTS
+    i2c.stuck = False
+    utime.advance_ms(RETRY_BACKOFF_MS)
+    board.service()
+    assert board.confirmed
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Precompile the growmax package to .mpy bytecode with mpy-cross.
+
+Compiling on the host saves the board from compiling every module at boot (slow, and a
+large heap spike that can raise MemoryError on a Pico).  One bundle is built per target
+architecture so the viper/native functions are compiled to machine code:
+
+    pip install mpy-cross            # must match the MicroPython version on the board
+    python tools/build_mpy.py                   # all targets
+    python tools/build_mpy.py --arch armv6m     # Raspberry Pi Pico / Pico W only
+
+Copy ``build/<arch>/growmax`` to ``/lib/growmax`` on the board.  To freeze growmax into a
+custom firmware instead, include the ``manifest.py`` at the repository root from the
+board's manifest.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE = os.path.join(ROOT, "src")
+PACKAGE = "growmax"
+
+# Target name -> mpy-cross -march value
+TARGETS = {
+    "rp2040": "armv6m",  # Raspberry Pi Pico / Pico W
+    "esp32s3": "xtensawin",  # ESP32-S3 (BananaPi)
+}
+
+
+def find_mpy_cross(path=None):
+    """Return the command to run mpy-cross, preferring an explicit path."""
+    if path:
+        return [path]
+    executable = shutil.which("mpy-cross")
+    if executable:
+        return [executable]
+    try:
+        import mpy_cross  # noqa: F401  pip install mpy-cross
+    except ImportError:
+        sys.exit("mpy-cross not found: pip install mpy-cross, or pass --mpy-cross PATH")
+    return [sys.executable, "-m", "mpy_cross"]
+
+
+def iter_modules():
+    """Yield (source path, path relative to src) for every module of the package."""
+    for directory, _, files in os.walk(os.path.join(SOURCE, PACKAGE)):
+        for name in sorted(files):
+            if name.endswith(".py"):
+                path = os.path.join(directory, name)
+                yield path, os.path.relpath(path, SOURCE)
+
+
+def build(mpy_cross, target, march, out_dir, opt):
+    count = 0
+    for path, relative in iter_modules():
+        output = os.path.join(out_dir, target, relative[:-3] + ".mpy")
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        command = mpy_cross + ["-march=" + march, "-O" + str(opt), "-s", relative.replace(os.sep, "/"),
+                               "-o", output, path]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode:
+            sys.exit("mpy-cross failed for {}:\n{}".format(relative, result.stderr))
+        count += 1
+    print("{}: {} modules -> {}".format(target, count, os.path.join(out_dir, target, PACKAGE)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--arch", choices=sorted(TARGETS) + sorted(TARGETS.values()), action="append",
+                        help="target to build (default: all)")
+    parser.add_argument("--out", default=os.path.join(ROOT, "build"), help="output directory")
+    parser.add_argument("--mpy-cross", help="path to the mpy-cross executable")
+    parser.add_argument("-O", dest="opt", type=int, default=2,
+                        help="optimization level; 1+ strips asserts, 3 also drops line numbers")
+    args = parser.parse_args()
+
+    mpy_cross = find_mpy_cross(args.mpy_cross)
+    version = subprocess.run(mpy_cross + ["--version"], capture_output=True, text=True)
+    print(version.stdout.strip() or version.stderr.strip())
+
+    selected = args.arch or sorted(TARGETS)
+    for target, march in sorted(TARGETS.items()):
+        if target in selected or march in selected:
+            build(mpy_cross, target, march, args.out, args.opt)
+
+
+if __name__ == "__main__":
+    main()